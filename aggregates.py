@@ -0,0 +1,176 @@
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date as Date
+
+import metrics
+from complaint_cache import register_derived
+
+
+# Titles kept per bucket for chart hover text
+TITLE_SAMPLE_CAP = int(os.getenv("TITLE_SAMPLE_CAP", "20"))
+
+
+def _valid_date(date_str):
+    try:
+        Date.fromisoformat(str(date_str))
+    except ValueError:
+        return False
+    return True
+
+
+def _hour(time_str):
+    try:
+        hour = int(str(time_str).split(":")[0])
+    except ValueError:
+        return None
+    return hour if 0 <= hour <= 23 else None
+
+
+class ComplaintCube:
+    """
+    Complaint counts per (date, hour, status, author) bucket.
+
+    Each bucket holds a count and up to TITLE_SAMPLE_CAP problem titles.
+    Buckets are grouped by date and the dates kept sorted, so date-range
+    queries only visit the buckets of the selected days. The bucket of
+    every row position is remembered so a status change can move the row
+    between buckets.
+
+    Writes run on the submit-queue thread while pages read. A write copies
+    the days it changes and swaps the result in with one assignment of
+    _state, and buckets are tuples, so a reader never sees a dict change
+    size under it.
+    """
+
+    def __init__(self, title_cap=TITLE_SAMPLE_CAP):
+        self.title_cap = title_cap
+        # (date -> (hour, status, author) -> (count, titles), sorted dates)
+        self._state = ({}, [])
+        # row position -> (date, hour, status, author, title) or None;
+        # only the writer uses it
+        self._keys = []
+
+    def add(self, rows):
+        """Add rows given as (date, time, status, author, title) tuples."""
+        added = []
+        for date, time, status, author, title in rows:
+            hour = _hour(time)
+            if hour is None or not _valid_date(date):
+                self._keys.append(None)
+                continue
+            key = (date, hour, status, author, title)
+            self._keys.append(key)
+            added.append(key)
+        self._write((), added)
+
+    def set_status(self, positions, new_status):
+        removed, added = [], []
+        for position in positions:
+            key = self._keys[position]
+            if key is None or key[2] == new_status:
+                continue
+            removed.append(key)
+            key = key[:2] + (new_status,) + key[3:]
+            self._keys[position] = key
+            added.append(key)
+        if added:
+            self._write(removed, added)
+
+    def _write(self, removed, added):
+        old, dates = self._state
+        by_date = dict(old)
+        copied = set()
+
+        def day(date):
+            if date not in copied:
+                by_date[date] = dict(by_date.get(date, {}))
+                copied.add(date)
+            return by_date[date]
+
+        for date, hour, status, author, title in removed:
+            buckets = day(date)
+            count, titles = buckets[(hour, status, author)]
+            if count == 1:
+                del buckets[(hour, status, author)]
+                continue
+            if title in titles:
+                titles = list(titles)
+                titles.remove(title)
+                titles = tuple(titles)
+            buckets[(hour, status, author)] = (count - 1, titles)
+        for date, hour, status, author, title in added:
+            buckets = day(date)
+            count, titles = buckets.get((hour, status, author), (0, ()))
+            if len(titles) < self.title_cap:
+                titles += (title,)
+            buckets[(hour, status, author)] = (count + 1, titles)
+        for date in copied:
+            if not by_date[date]:
+                del by_date[date]
+        if any((date in old) != (date in by_date) for date in copied):
+            dates = sorted(by_date)
+        self._state = (by_date, dates)
+
+    def _buckets(self, date_from=None, date_to=None, author=None, status=None):
+        by_date, dates = self._state
+        if date_from is not None and date_from == date_to:
+            selected = [date_from]
+        else:
+            lo = 0 if date_from is None else bisect_left(dates, date_from)
+            hi = len(dates) if date_to is None else bisect_right(dates, date_to)
+            selected = dates[lo:hi]
+        for date in selected:
+            buckets = by_date.get(date, {})
+            for (hour, bucket_status, bucket_author), bucket in buckets.items():
+                if author is not None and bucket_author != author:
+                    continue
+                if status is not None and bucket_status != status:
+                    continue
+                yield date, hour, bucket
+
+    def date_bounds(self, author=None, status=None):
+        """(min_date, max_date) as "YYYY-MM-DD" strings, or (None, None)."""
+        if author is None and status is None:
+            dates = self._state[1]
+            return (dates[0], dates[-1]) if dates else (None, None)
+        dates = {d for d, _, _ in self._buckets(author=author, status=status)}
+        if not dates:
+            return None, None
+        return min(dates), max(dates)
+
+    def total(self, date_from=None, date_to=None, author=None, status=None):
+        return sum(b[0] for _, _, b in self._buckets(date_from, date_to, author, status))
+
+    def hourly(self, date_from=None, date_to=None, author=None, status=None):
+        """Return (counts, titles): 24 counts and 24 lists of sample titles."""
+        counts = [0] * 24
+        titles = [[] for _ in range(24)]
+        for _, hour, bucket in self._buckets(date_from, date_to, author, status):
+            counts[hour] += bucket[0]
+            room = self.title_cap - len(titles[hour])
+            if room > 0:
+                titles[hour].extend(bucket[1][:room])
+        return counts, titles
+
+
+@metrics.timed("cube_build")
+def _build_cube(snapshot):
+    cube = ComplaintCube()
+    cube.add(_entries(snapshot.rows))
+    return cube
+
+
+def _entries(rows):
+    return ((row[3], row[4], row[6], row[0], row[1]) for row in rows)
+
+
+def _update_cube(cube, snapshot, event, change):
+    if event == "append":
+        cube.add(_entries(change[1]))
+    else:
+        positions, new_status = change
+        cube.set_status(positions, new_status)
+    return cube
+
+
+register_derived("cube", _build_cube, _update_cube)
@@ -0,0 +1,325 @@
+"""
+Read-only JSON API over the shared complaint snapshot.
+
+    python api_server.py --port 8502
+
+or set API_SERVER=1 to have the Streamlit app start it on a background
+thread, sharing the app's snapshot cache instead of keeping its own.
+
+GET /complaints
+    status, author       exact match
+    date_from, date_to   YYYY-MM-DD, inclusive
+    bbox                 west,south,east,north in degrees
+    limit                page size (default API_PAGE_SIZE)
+    cursor               next_cursor of the previous page
+GET /complaints/<id>
+
+Responses carry an ETag derived from the complaint IDs and statuses, so
+a poller sending If-None-Match gets an empty 304 until a complaint was
+added or changed status, however often the snapshot is reloaded.
+Bodies of 1 KB and more are gzipped for clients that accept it.
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+import tornado.web
+from cachetools import LRUCache
+from tornado.ioloop import IOLoop
+
+import metrics
+import spatial_index  # noqa: F401  registers the "spatial" snapshot structure
+from complaint import ID_COLUMN, STATUS_COLUMN, parse_location
+from complaint_cache import register_derived
+from storage import get_backend
+
+logger = logging.getLogger(__name__)
+
+
+API_SERVER = os.getenv("API_SERVER", "").lower() in ("1", "true", "yes")
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8502"))
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "100"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "1000"))
+# Filter results kept so paging through them does not filter again
+API_RESULT_CACHE_SIZE = int(os.getenv("API_RESULT_CACHE_SIZE", "64"))
+
+# JSON field names, in COLUMNS order
+FIELDS = ["author", "title", "description", "date", "time", "location", "status", "id"]
+
+
+def _date(value, name):
+    # Compared as text, so the format must be exact (strptime allows "6-1")
+    try:
+        if datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d") != value:
+            raise ValueError(value)
+    except ValueError:
+        raise tornado.web.HTTPError(400, reason=f"{name} must be YYYY-MM-DD")
+    return value
+
+
+def _bbox(value):
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except ValueError:
+        raise tornado.web.HTTPError(400, reason="bbox must be west,south,east,north")
+    if south > north or west > east:
+        raise tornado.web.HTTPError(400, reason="bbox must be west,south,east,north")
+    return south, west, north, east
+
+
+def _sort_key(location):
+    # The main tab (None) comes before the month tabs, as when loading
+    tab, number = location
+    return tab or "", number
+
+
+def encode_cursor(location):
+    text = json.dumps(list(location))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tab, number = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not (tab is None or isinstance(tab, str)) or not isinstance(number, int):
+            raise ValueError(cursor)
+    except (ValueError, TypeError, binascii.Error):
+        raise tornado.web.HTTPError(400, reason="Invalid cursor")
+    return _sort_key((tab, number))
+
+
+def to_json(row):
+    item = dict(zip(FIELDS, row))
+    lat, lng = parse_location(row[5])
+    item["lat"] = None if math.isnan(lat) else lat
+    item["lng"] = None if math.isnan(lng) else lng
+    return item
+
+
+def matching_positions(
+    snapshot, author=None, status=None, date_from=None, date_to=None, bbox=None
+):
+    """Sorted row positions of the snapshot rows that pass every filter."""
+    positions = snapshot.derived("facets").positions(author, status, date_from, date_to)
+    if bbox is not None:
+        inside = np.array(
+            sorted(snapshot.derived("spatial").query_bbox(*bbox)), dtype=np.int64
+        )
+        positions = np.intersect1d(positions, inside, assume_unique=True)
+    return positions.tolist()
+
+
+def _content_tag(snapshot):
+    """Digest of the row count and every row's ID and status."""
+    positions = range(len(snapshot.rows))
+    if snapshot.locations is not None:
+        # Appends to month tabs land at the end until the next reload
+        positions = sorted(positions, key=lambda p: _sort_key(snapshot.locations[p]))
+    digest = hashlib.blake2b(str(len(positions)).encode(), digest_size=12)
+    rows = snapshot.rows
+    for position in positions:
+        row = rows[position]
+        digest.update(f"\0{row[ID_COLUMN]}\0{row[STATUS_COLUMN]}".encode())
+    return digest.hexdigest()
+
+
+# Rebuilt after every write, so it is computed once per snapshot state
+register_derived("etag", _content_tag)
+
+
+class ResultCache:
+    """
+    LRU of filter results per snapshot version, shared by all requests.
+    A result is (positions, keys): the matching row positions in the order
+    pages serve them, and the sort key of each one's (tab, row number).
+    """
+
+    def __init__(self, maxsize=API_RESULT_CACHE_SIZE):
+        self._data = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, snapshot, filters):
+        key = (snapshot.version, filters)
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+        positions = matching_positions(snapshot, *filters)
+        keys = [_sort_key(snapshot.location(p)) for p in positions]
+        if snapshot.locations is not None:
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            positions = [positions[i] for i in order]
+            keys = [keys[i] for i in order]
+        with self._lock:
+            self._data[key] = positions, keys
+        return positions, keys
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, backend, results):
+        self.backend = backend
+        self.results = results
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        # Pollers revalidate every time; unchanged data costs a 304
+        self.set_header("Cache-Control", "no-cache")
+
+    def write_json(self, value):
+        self.write(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason})
+
+    def on_finish(self):
+        metrics.inc("api_requests", handler=type(self).__name__, status=self.get_status())
+
+    async def snapshot(self):
+        # Loading may call the Sheets API; keep the event loop free meanwhile
+        snapshot = await IOLoop.current().run_in_executor(None, self.backend.snapshot)
+        if snapshot is None:
+            raise tornado.web.HTTPError(503, reason="Complaint data is unavailable")
+        return snapshot
+
+    def not_modified(self, snapshot):
+        """Set the ETag; True (with a 304 set) if the client already has it."""
+        self._etag = f'W/"{snapshot.derived("etag")}"'
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.set_status(304)
+            return True
+        return False
+
+    def compute_etag(self):
+        return getattr(self, "_etag", None)
+
+
+class ComplaintsHandler(BaseHandler):
+    async def get(self):
+        args = {
+            name: self.get_query_argument(name, None) or None
+            for name in ("author", "status", "date_from", "date_to", "bbox")
+        }
+        date_from = args["date_from"] and _date(args["date_from"], "date_from")
+        date_to = args["date_to"] and _date(args["date_to"], "date_to")
+        bbox = args["bbox"] and _bbox(args["bbox"])
+        try:
+            limit = int(self.get_query_argument("limit", API_PAGE_SIZE))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="limit must be a number")
+        limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+        cursor = self.get_query_argument("cursor", None)
+        after = decode_cursor(cursor) if cursor else None
+
+        snapshot = await self.snapshot()
+        if self.not_modified(snapshot):
+            return
+        filters = (args["author"], args["status"], date_from, date_to, bbox)
+        with metrics.span("api_filter"):
+            positions, keys = self.results.get(snapshot, filters)
+        # Rows are never moved or deleted, so a (tab, row number) names the
+        # same complaint in every snapshot, while positions shift when a
+        # reload merges month tabs. Pages run in location order and the
+        # cursor holds the location of the last row served.
+        start = 0 if after is None else bisect_right(keys, after)
+        page = positions[start : start + limit]
+        rows = snapshot.rows
+        has_more = start + limit < len(positions)
+        next_cursor = encode_cursor(snapshot.location(page[-1])) if has_more else None
+        self.write_json(
+            {
+                "items": [to_json(rows[p]) for p in page],
+                "total": len(positions),
+                "next_cursor": next_cursor,
+                "version": snapshot.version,
+            }
+        )
+
+
+class ComplaintHandler(BaseHandler):
+    async def get(self, complaint_id):
+        snapshot = await self.snapshot()
+        positions = snapshot.positions([complaint_id])
+        if not positions:
+            raise tornado.web.HTTPError(404, reason="No such complaint")
+        if self.not_modified(snapshot):
+            return
+        self.write_json(to_json(snapshot.rows[positions[0]]))
+
+
+def make_app(backend=None):
+    settings = {
+        "backend": backend or get_backend(),
+        "results": ResultCache(),
+    }
+    return tornado.web.Application(
+        [
+            (r"/complaints", ComplaintsHandler, settings),
+            (r"/complaints/([^/]+)", ComplaintHandler, settings),
+        ],
+        compress_response=True,
+    )
+
+
+_server_thread = None
+_server_lock = threading.Lock()
+
+
+def start_api_server(backend, port=API_PORT, host=API_HOST):
+    """
+    Serve the API from a daemon thread of this process, once, if
+    API_SERVER is set. Safe to call on every Streamlit rerun.
+    """
+    global _server_thread
+    if not API_SERVER:
+        return
+    with _server_lock:
+        if _server_thread is not None:
+            return
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            try:
+                make_app(backend).listen(port, address=host)
+            except OSError as error:
+                # e.g. another app process already serves this port
+                logger.warning("API server not started on port %d: %s", port, error)
+                return
+            finally:
+                started.set()
+            logger.info("API server listening on %s:%d", host, port)
+            IOLoop.current().start()
+
+        _server_thread = threading.Thread(target=serve, name="api-server", daemon=True)
+        _server_thread.start()
+        started.wait()
+
+
+async def _serve(port, host):
+    make_app().listen(port, address=host)
+    print(f"Serving complaints on http://{host}:{port}/complaints")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+    asyncio.run(_serve(args.port, args.host))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Offline benchmark suite.
+
+Runs the app's data paths against fake_sheets.FakeSheets with a simulated
+network latency and writes the timings as JSON, e.g.:
+
+    python benchmark.py --sizes 1000 10000 100000 --latency 0.05 --bandwidth 2e6 \
+        --output bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import folium
+
+import utils
+from complaint_frame import filter_complaint_frame, load_complaint_frame
+import facet_index  # noqa: F401  registers the "facets" snapshot structure
+from fake_sheets import FakeSheets, FakeSheetsClient
+from sheets_scheduler import QuotaScheduler
+from density import cell_size_m
+from map_render import (
+    RenderedMapCache,
+    add_marker_layer,
+    density_cells,
+    density_layer,
+    location_records,
+    render_marker_map,
+    title_records,
+)
+
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+# Sessions reading the sheet at the same moment
+CONCURRENT_READERS = 8
+CENTER_START = [37.56325563600076, 126.93753719329834]
+
+
+def timed(fn, repeat):
+    """Run fn repeat times; return (seconds per run, last result)."""
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return seconds, result
+
+
+def record(results, name, rows, seconds, **extra):
+    entry = {
+        "name": name,
+        "rows": rows,
+        "runs": len(seconds),
+        "min_s": min(seconds),
+        "median_s": statistics.median(seconds),
+        "max_s": max(seconds),
+    }
+    entry.update(extra)
+    results.append(entry)
+    print(f"{name:<28} rows={rows:<8} median={entry['median_s'] * 1000:10.2f} ms")
+    return entry
+
+
+def map_payload(records):
+    m = folium.Map(location=CENTER_START, zoom_start=16)
+    fg = add_marker_layer(m, records, "Marker")
+    if fg is not None:
+        fg.add_to(m)
+    return len(m.get_root().render())
+
+
+def bench_size(size, latency, repeat, bandwidth=None):
+    results = []
+    # Timed separately below, in a throwaway directory
+    utils.PARQUET_SNAPSHOT_DIR = None
+    random.seed(size)
+    sheets = FakeSheets(latency=latency, bandwidth=bandwidth)
+    sheets.load_rows([utils.random_test_row(i) for i in range(size)])
+    utils.set_client(FakeSheetsClient(sheets))
+
+    seconds, rows = timed(utils.get_data_from_sheet, repeat)
+    record(results, "get_data_from_sheet", size, seconds)
+
+    def concurrent_reads():
+        with ThreadPoolExecutor(CONCURRENT_READERS) as pool:
+            for _ in range(CONCURRENT_READERS):
+                pool.submit(utils.get_data_from_sheet)
+
+    # The same reads with identical in-flight requests merged; no quota
+    for name, scheduler in [
+        ("concurrent_reads", None),
+        ("concurrent_reads_merged", QuotaScheduler(0, 0)),
+    ]:
+        utils.set_client(FakeSheetsClient(sheets, scheduler))
+        calls = sheets.calls
+        seconds, _ = timed(concurrent_reads, repeat)
+        record(
+            results, name, size, seconds,
+            requests=(sheets.calls - calls) / repeat,
+        )
+    utils.set_client(FakeSheetsClient(sheets))
+
+    def cold_snapshot():
+        utils.complaint_cache.invalidate()
+        return utils.get_snapshot()
+
+    seconds, snapshot = timed(cold_snapshot, repeat)
+    record(results, "snapshot_load", size, seconds)
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        utils.PARQUET_SNAPSHOT_DIR = snapshot_dir
+        cold_snapshot()
+        seconds, _ = timed(cold_snapshot, repeat)
+        record(results, "snapshot_load_parquet_warm", size, seconds)
+        utils.PARQUET_SNAPSHOT_DIR = None
+
+    seconds, df = timed(lambda: load_complaint_frame(rows), repeat)
+    record(results, "build_frame", size, seconds)
+
+    seconds, filtered = timed(
+        lambda: filter_complaint_frame(
+            df, author="Author1", status="Pending", date_from="2025-06-02",
+            date_to="2025-06-02",
+        ),
+        repeat,
+    )
+    record(results, "filter_frame", size, seconds, matches=len(filtered))
+
+    facets = snapshot.derived("facets")
+    seconds, positions = timed(
+        lambda: facets.positions(
+            author="Author1", status="Pending", date_from="2025-06-02",
+            date_to="2025-06-02",
+        ),
+        repeat,
+    )
+    record(results, "filter_facets", size, seconds, matches=len(positions))
+
+    seconds, records = timed(lambda: location_records(df), repeat)
+    record(results, "location_records", size, seconds)
+
+    seconds, payload = timed(lambda: map_payload(location_records(df)), 1)
+    record(results, "map_payload_all", size, seconds, payload_bytes=payload)
+
+    def density_payload():
+        m = folium.Map(location=CENTER_START, zoom_start=15)
+        density_layer(density_cells(df, cell_size_m(15))).add_to(m)
+        return len(m.get_root().render())
+
+    seconds, payload = timed(density_payload, repeat)
+    record(results, "map_payload_density", size, seconds, payload_bytes=payload)
+
+    # Second and later lookups of the same snapshot version and filters
+    map_cache = RenderedMapCache()
+
+    def cached_map():
+        return map_cache.get(
+            snapshot.version,
+            ("all", None, None),
+            lambda: render_marker_map(location_records(df), "Marker", CENTER_START),
+        )
+
+    cached_map()
+    seconds, _ = timed(cached_map, repeat)
+    record(results, "map_cached", size, seconds)
+
+    seconds, payload = timed(lambda: map_payload(title_records(filtered)), repeat)
+    record(
+        results, "map_payload_filtered", len(filtered), seconds, payload_bytes=payload
+    )
+
+    counter = iter(range(size, size + repeat))
+    seconds, _ = timed(lambda: utils.save_to_sheet(utils.random_test_row(next(counter))), repeat)
+    record(results, "save_to_sheet", size, seconds)
+
+    snapshot = utils.get_snapshot()
+    ids = [row[-1] for row in random.sample(snapshot.rows, min(3, len(snapshot.rows)))]
+    seconds, _ = timed(lambda: utils.update_status_in_sheet(ids, "Resolved"), repeat)
+    record(results, "update_status_in_sheet", size, seconds, selected=len(ids))
+
+    for entry in results:
+        entry["api_calls"] = sheets.calls
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="simulated seconds per API call"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=None,
+        help="simulated response bytes per second (default: unlimited)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        print(f"--- {size} rows")
+        results.extend(bench_size(size, args.latency, args.repeat, args.bandwidth))
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "latency_s": args.latency,
+        "bandwidth_bps": args.bandwidth,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
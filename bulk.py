@@ -0,0 +1,302 @@
+"""
+Stream complaints between files and the configured storage backend.
+
+    python bulk.py import complaints.csv
+    python bulk.py export archive.parquet --page-rows 5000
+
+Formats are CSV (with a header row), JSONL (one object or array per line)
+and Parquet, picked by file extension or --format. Both directions hold
+at most one batch or page in memory. Imported rows are checked like a
+reported complaint: rows with an empty field or an invalid status are
+skipped and counted. An import records its progress in a checkpoint file
+and continues from there when run again on the same file.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+from complaint import COLUMNS, ComplaintBatch
+from storage import get_backend
+from utils import APPEND_CHUNK_ROWS
+
+
+FORMATS = ("csv", "jsonl", "parquet")
+# Rows sent per append_many call: a few append requests' worth
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", str(APPEND_CHUNK_ROWS * 10)))
+EXPORT_PAGE_ROWS = int(os.getenv("EXPORT_PAGE_ROWS", "5000"))
+
+
+def detect_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format: {fmt}. Valid formats are: {list(FORMATS)}")
+    return fmt
+
+
+def _cells(values):
+    return ["" if v is None else str(v) for v in values]
+
+
+def _from_record(record):
+    if isinstance(record, dict):
+        return _cells(record.get(column) for column in COLUMNS)
+    return _cells(record)
+
+
+# --- readers: each yields rows as lists in COLUMNS order -------------------
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from (_from_record(record) for record in csv.DictReader(f))
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield _from_record(json.loads(line))
+
+
+def read_parquet(path, batch_rows=EXPORT_PAGE_ROWS):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    columns = [c for c in COLUMNS if c in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+        data = batch.to_pydict()
+        for index in range(batch.num_rows):
+            yield _cells(data[c][index] if c in data else None for c in COLUMNS)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "parquet": read_parquet}
+
+
+# --- writers: write() takes one page of rows at a time --------------------
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self._file.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+            self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes each page as its own row group."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.string()) for c in COLUMNS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = [[row[i] for row in rows] for i in range(len(COLUMNS))]
+        self._writer.write_table(
+            self._pa.Table.from_arrays(columns, schema=self._schema)
+        )
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+class Progress:
+    """Single-line rows / throughput readout on stderr."""
+
+    def __init__(self, label, start=0):
+        self.label = label
+        self.done = start
+        self._start = start
+        self._t0 = time.monotonic()
+
+    def update(self, rows):
+        self.done += rows
+        elapsed = time.monotonic() - self._t0
+        rate = (self.done - self._start) / elapsed if elapsed else 0.0
+        print(
+            f"\r{self.label}: {self.done} rows, {rate:,.0f} rows/s, {elapsed:,.0f}s",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    def finish(self):
+        print(file=sys.stderr)
+
+
+# --- checkpoints -----------------------------------------------------------
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_checkpoint(checkpoint, path):
+    """Rows of path already imported, per the checkpoint file, else 0."""
+    try:
+        with open(checkpoint) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if {k: state.get(k) for k in ("input", "size", "mtime")} != _fingerprint(path):
+        # The checkpoint belongs to another file or an older version of it
+        return 0
+    return int(state.get("rows_done", 0))
+
+
+def save_checkpoint(checkpoint, path, rows_done):
+    state = dict(_fingerprint(path), rows_done=rows_done)
+    tmp = f"{checkpoint}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint)
+
+
+# --- commands --------------------------------------------------------------
+
+
+def import_file(
+    path,
+    fmt=None,
+    checkpoint=None,
+    batch_rows=IMPORT_BATCH_ROWS,
+    restart=False,
+    backend=None,
+):
+    """
+    Append every valid row of path to the backend, batch_rows at a time.
+    Returns the number of rows imported by this run. Raises RuntimeError
+    when a batch fails; the checkpoint then points just past the last
+    stored row.
+    """
+    fmt = detect_format(path, fmt)
+    backend = backend or get_backend()
+    checkpoint = checkpoint or f"{path}.checkpoint.json"
+    skip = 0 if restart else load_checkpoint(checkpoint, path)
+    if skip:
+        print(f"Resuming after {skip} rows from {checkpoint}", file=sys.stderr)
+    rows = islice(READERS[fmt](path), skip, None)
+    progress = Progress("imported", skip)
+    # Input rows stored or skipped so far
+    done = skip
+    invalid = 0
+    while True:
+        chunk = list(islice(rows, batch_rows))
+        if not chunk:
+            break
+        # Validated and given IDs column-wise, without a Complaint per row
+        batch = ComplaintBatch.from_rows(chunk)
+        keep = np.flatnonzero(batch.valid_mask() & batch.status_mask())
+        invalid += len(batch) - len(keep)
+        results = backend.append_many(batch.filter(keep), stop_on_error=True)
+        stored = sum(len(r.rows) for r in results if r.ok)
+        progress.update(stored)
+        # Up to the first valid row that was not stored
+        done += len(batch) if stored == len(keep) else int(keep[stored])
+        save_checkpoint(checkpoint, path, done)
+        failed = [r for r in results if not r.ok]
+        if failed:
+            progress.finish()
+            raise RuntimeError(
+                f"Import stopped after {done} rows: {failed[0].error}. "
+                "Run the same command again to resume."
+            )
+    progress.finish()
+    if invalid:
+        print(
+            f"Skipped {invalid} rows with an empty field or an invalid status",
+            file=sys.stderr,
+        )
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return progress.done - skip
+
+
+def export_file(path, fmt=None, page_rows=EXPORT_PAGE_ROWS, backend=None):
+    """Write every stored row to path, one page at a time. Returns the row count."""
+    fmt = detect_format(path, fmt)
+    backend = backend or get_backend()
+    writer = WRITERS[fmt](path)
+    progress = Progress("exported")
+    try:
+        for rows in backend.iter_pages(page_rows):
+            writer.write(rows)
+            progress.update(len(rows))
+    finally:
+        writer.close()
+        progress.finish()
+    return progress.done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="append a file's rows")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=FORMATS)
+    importer.add_argument("--batch-rows", type=int, default=IMPORT_BATCH_ROWS)
+    importer.add_argument(
+        "--checkpoint", help="progress file (default: <path>.checkpoint.json)"
+    )
+    importer.add_argument(
+        "--restart", action="store_true", help="ignore an existing checkpoint"
+    )
+
+    exporter = commands.add_parser("export", help="write every row to a file")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=FORMATS)
+    exporter.add_argument("--page-rows", type=int, default=EXPORT_PAGE_ROWS)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "import":
+            count = import_file(
+                args.path, args.format, args.checkpoint, args.batch_rows, args.restart
+            )
+            print(f"Imported {count} rows from {args.path}")
+        else:
+            count = export_file(args.path, args.format, args.page_rows)
+            print(f"Exported {count} rows to {args.path}")
+    except (OSError, ValueError, RuntimeError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
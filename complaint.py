@@ -1,4 +1,97 @@
+import math
+import re
+import uuid
+from enum import Enum
+
+import numpy as np
+
+
+# Sheet column order, A:H
+COLUMNS = [
+    "Author",
+    "Problem Title",
+    "Description",
+    "Date",
+    "Time",
+    "Location",
+    "Status",
+    "ID",
+]
+STATUS_COLUMN = COLUMNS.index("Status")
+ID_COLUMN = COLUMNS.index("ID")
+# Location cells hold "[lat, lng]"; the brackets are optional
+LOCATION_PATTERN = r"^\s*\[?\s*(-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\s*\]?\s*$"
+_LOCATION = re.compile(LOCATION_PATTERN)
+
+
+def parse_location(location):
+    """(lat, lng) floats of a location cell, or (nan, nan) if unreadable."""
+    match = _LOCATION.match(str(location))
+    if not match:
+        return math.nan, math.nan
+    return float(match.group(1)), float(match.group(2))
+
+
+def new_complaint_id():
+    """Return a new compact, unique complaint ID (12 hex characters)."""
+    return uuid.uuid4().hex[:12]
+
+
+def legacy_row_id(row_number, tab=None):
+    """
+    ID for a row written before complaints had IDs. The sheet is only ever
+    appended to, so the row number identifies such a row for good, and
+    utils.backfill_ids stores it in the row on the next load. tab is the
+    month tab the row is in, or None for the main complaint tab.
+    """
+    if tab is None:
+        return f"r{row_number}"
+    return f"{tab}!r{row_number}"
+
+
+def normalize_row(row, row_number=None, tab=None):
+    """
+    Pad a sheet row to every column as strings. A missing ID becomes the
+    legacy ID of row_number (in tab), or a new ID when row_number is None.
+    """
+    row = [str(v) for v in row[: len(COLUMNS)]]
+    row += [""] * (len(COLUMNS) - len(row))
+    if not row[ID_COLUMN]:
+        if row_number is None:
+            row[ID_COLUMN] = new_complaint_id()
+        else:
+            row[ID_COLUMN] = legacy_row_id(row_number, tab)
+    return row
+
+
+class Status(str, Enum):
+    PENDING = "Pending"
+    IN_PROGRESS = "In Progress"
+    RESOLVED = "Resolved"
+    CLOSED = "Closed"
+
+    def __str__(self):
+        return self.value
+
+    def __format__(self, format_spec):
+        return format(self.value, format_spec)
+
+
+VALID_STATUSES = tuple(s.value for s in Status)
+
+
 class Complaint:
+    __slots__ = (
+        "author",
+        "problem",
+        "description",
+        "date",
+        "time",
+        "location",
+        "status",
+        "id",
+    )
+
     def __init__(
         self,
         author=None,
@@ -14,31 +107,113 @@ class Complaint:
         self.date = date
         self.time = time
         self.location = location
-        self.status = "Pending"  # Default status for new complaints
+        self.status = Status.PENDING  # Default status for new complaints
+        self.id = new_complaint_id()
 
     def set_status(self, status):
-        valid_statuses = ["Pending", "In Progress", "Resolved", "Closed"]
-        if status in valid_statuses:
-            self.status = status
-        else:
+        try:
+            self.status = Status(status)
+        except ValueError:
             raise ValueError(
-                f"Invalid status: {status}. Valid statuses are: {valid_statuses}"
-            )
+                f"Invalid status: {status}. Valid statuses are: {list(VALID_STATUSES)}"
+            ) from None
 
     def is_valid(self):
-        return all(
-            [
-                self.author,
-                self.problem,
-                self.description,
-                self.date,
-                self.time,
-                self.location
-            ]
+        return bool(
+            self.author
+            and self.problem
+            and self.description
+            and self.date
+            and self.time
+            and self.location
         )
 
+    def to_row(self):
+        """Return the complaint as a sheet row in column order A:H."""
+        return [
+            str(self.author),
+            str(self.problem),
+            str(self.description),
+            str(self.date),
+            str(self.time),
+            str(self.location),
+            str(self.status),
+            str(self.id),
+        ]
+
     def __str__(self):
         return f"Complaint by {self.author} on {self.date} at {self.time}: Problem title:{self.problem}, Problem Description: {self.description} (Location: {self.location}), Current Status: {self.status}"
 
     def __repr__(self):
         return self.__str__()
+
+
+class ComplaintBatch:
+    """
+    Many complaints stored column-wise, one numpy array per field.
+
+    Used by bulk import to validate and append rows without creating a
+    Complaint object per row. Fields follow Complaint.__slots__, which
+    matches the sheet column order.
+    """
+
+    FIELDS = Complaint.__slots__
+
+    def __init__(self, columns):
+        lengths = {len(columns[field]) for field in self.FIELDS}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self.columns = {
+            field: np.asarray(columns[field], dtype=object) for field in self.FIELDS
+        }
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a batch from sheet rows; short rows are padded with "".
+        Rows without an ID are given a new one."""
+        width = len(cls.FIELDS)
+        padded = [list(row[:width]) + [""] * (width - len(row)) for row in rows]
+        grid = np.array(padded, dtype=object).reshape(len(padded), width)
+        ids = grid[:, ID_COLUMN]
+        missing = np.flatnonzero((ids == "") | np.equal(ids, None))
+        for i in missing.tolist():
+            ids[i] = new_complaint_id()
+        return cls({field: grid[:, i] for i, field in enumerate(cls.FIELDS)})
+
+    def __len__(self):
+        return len(self.columns[self.FIELDS[0]])
+
+    def __getitem__(self, index):
+        complaint = Complaint()
+        for field in self.FIELDS:
+            setattr(complaint, field, self.columns[field][index])
+        if complaint.status in VALID_STATUSES:
+            complaint.status = Status(complaint.status)
+        return complaint
+
+    def valid_mask(self):
+        """Vectorized Complaint.is_valid: True where every field but status/id is set."""
+        mask = np.ones(len(self), dtype=bool)
+        for field in self.FIELDS:
+            if field in ("status", "id"):
+                continue
+            column = self.columns[field]
+            mask &= (column != "") & np.not_equal(column, None)
+        return mask
+
+    def status_mask(self):
+        """True where the status is one of VALID_STATUSES."""
+        valid = set(VALID_STATUSES)
+        return np.fromiter(
+            (status in valid for status in self.columns["status"]), bool, len(self)
+        )
+
+    def filter(self, mask):
+        return ComplaintBatch({f: c[mask] for f, c in self.columns.items()})
+
+    def to_rows(self):
+        """Return the batch as sheet rows in column order A:H."""
+        # Per cell: a fixed-width string array would be as wide as the
+        # longest cell for every cell of the batch
+        columns = (self.columns[f] for f in self.FIELDS)
+        return [["" if v is None else str(v) for v in row] for row in zip(*columns)]
@@ -0,0 +1,229 @@
+import itertools
+import threading
+
+from cachetools import TTLCache
+
+from complaint import ID_COLUMN, STATUS_COLUMN, normalize_row
+
+
+_versions = itertools.count(1)
+# name -> (build(snapshot), update(value, snapshot, event, change) or None)
+_derivations = {}
+
+
+def register_derived(name, build, update=None):
+    """
+    Register a structure derived from a Snapshot's rows.
+
+    build(snapshot) creates it on first use. update(value, snapshot, event,
+    change) keeps it current after a write and returns the new value, or
+    None to have it rebuilt on next use. event is "append" with change
+    (first_position, rows), or "status" with change (positions, new_status).
+    """
+    _derivations[name] = (build, update)
+
+
+def _build_id_index(snapshot):
+    return {row[ID_COLUMN]: position for position, row in enumerate(snapshot.rows)}
+
+
+def _update_id_index(index, snapshot, event, change):
+    if event == "append":
+        start, rows = change
+        for offset, row in enumerate(rows):
+            index[row[ID_COLUMN]] = start + offset
+    return index
+
+
+# Complaint ID -> row position, kept current on append
+register_derived("ids", _build_id_index, _update_id_index)
+
+
+class Snapshot:
+    """
+    One read of the complaint rows plus the structures derived from them.
+
+    Rows are normalized to every column, with legacy IDs for rows that
+    have none. rows is never modified in place; writes replace it with a
+    new list, so a caller holding an older rows list keeps a consistent
+    view. version changes on every write.
+
+    Row i is sheet row i + 2 of the complaint tab, unless the rows were
+    merged from several tabs; locations then holds the (tab, row number)
+    of every row, with tab None for the main complaint tab.
+    """
+
+    def __init__(self, rows, locations=None):
+        if locations is None:
+            self.rows = [
+                normalize_row(row, position + 2) for position, row in enumerate(rows)
+            ]
+            self._last_rows = None
+        else:
+            self.rows = [
+                normalize_row(row, number, tab)
+                for row, (tab, number) in zip(rows, locations)
+            ]
+            self._last_rows = {}
+            for tab, number in locations:
+                if number > self._last_rows.get(tab, 1):
+                    self._last_rows[tab] = number
+        self.locations = locations
+        self.version = next(_versions)
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    def location(self, position):
+        """(tab, sheet row number) of the row at position."""
+        if self.locations is None:
+            return None, position + 2
+        return self.locations[position]
+
+    def positions(self, ids):
+        """Row positions of the given complaint IDs; unknown IDs are skipped."""
+        index = self.derived("ids")
+        return [index[i] for i in ids if i in index]
+
+    def derived(self, name):
+        with self._lock:
+            if name not in self._derived:
+                build, _ = _derivations[name]
+                self._derived[name] = build(self)
+            return self._derived[name]
+
+    def apply(self, event, payload, first_row=None, tab=None):
+        """
+        Fold a write into the snapshot. Returns False if the write does not
+        line up with this snapshot (someone else appended), in which case
+        the snapshot should be dropped. Appends name the tab they went to
+        when the snapshot was merged from several tabs.
+        """
+        with self._lock:
+            if event == "append":
+                start = len(self.rows)
+                if self.locations is None:
+                    if tab is not None or (
+                        first_row is not None and first_row != start + 2
+                    ):
+                        return False
+                    appended = [
+                        normalize_row(row, start + offset + 2)
+                        for offset, row in enumerate(payload)
+                    ]
+                else:
+                    if first_row != self._last_rows.get(tab, 1) + 1:
+                        return False
+                    numbers = range(first_row, first_row + len(payload))
+                    appended = [
+                        normalize_row(row, number, tab)
+                        for row, number in zip(payload, numbers)
+                    ]
+                    self.locations = self.locations + [(tab, n) for n in numbers]
+                    self._last_rows[tab] = first_row + len(payload) - 1
+                change = (start, appended)
+                self.rows = self.rows + appended
+            elif event == "status":
+                ids, new_status = payload
+                positions = self.positions(ids)
+                rows = list(self.rows)
+                for position in positions:
+                    row = list(rows[position])
+                    row[STATUS_COLUMN] = new_status
+                    rows[position] = row
+                self.rows = rows
+                change = (positions, new_status)
+            else:
+                raise ValueError(f"Invalid event: {event}")
+            for name, value in list(self._derived.items()):
+                _, update = _derivations[name]
+                value = update(value, self, event, change) if update else None
+                if value is None:
+                    del self._derived[name]
+                else:
+                    self._derived[name] = value
+            self.version = next(_versions)
+            return True
+
+
+class ComplaintCache:
+    """
+    Process-wide read-through cache shared by every Streamlit session.
+
+    Entries expire after ttl seconds and at most maxsize entries are kept.
+    version changes whenever a cached value is loaded, updated or dropped,
+    so callers can tell whether data they derived is still current.
+    """
+
+    def __init__(self, ttl=60, maxsize=8):
+        self._data = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # Re-entrant so a loader may read another cached key
+        self._load_lock = threading.RLock()
+        self._generation = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.updates = 0
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss.
+        A loader result of None is treated as a failure and not cached."""
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                return self._data[key]
+        # Only one session reloads at a time; the rest wait and reuse it
+        with self._load_lock:
+            with self._lock:
+                if key in self._data:
+                    self.hits += 1
+                    return self._data[key]
+                self.misses += 1
+                generation = self._generation
+            value = loader()
+            with self._lock:
+                # Skip storing if a write happened mid-load
+                if value is not None and generation == self._generation:
+                    self.version += 1
+                    self._data[key] = value
+            return value
+
+    def peek(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+    def apply(self, event, payload, first_row=None, tab=None):
+        """
+        Fold a write into every cached Snapshot instead of dropping it.
+        See Snapshot.apply; snapshots the write does not fit are dropped.
+        """
+        with self._lock:
+            for key, value in list(self._data.items()):
+                if not isinstance(value, Snapshot):
+                    del self._data[key]
+                elif not value.apply(event, payload, first_row, tab):
+                    del self._data[key]
+            self._generation += 1
+            self.version += 1
+            self.updates += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self.version += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "updates": self.updates,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._data),
+                "version": self.version,
+            }
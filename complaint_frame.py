@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from pandas.api.types import union_categoricals
+
+import metrics
+from complaint import COLUMNS, LOCATION_PATTERN
+from complaint_cache import register_derived
+
+
+@metrics.timed("frame_build")
+def load_complaint_frame(rows):
+    """
+    Turn raw sheet rows into a typed DataFrame in one vectorized pass.
+
+    Adds float64 Lat/Lng parsed from "[lat, lng]", a datetime64 Timestamp
+    from Date and Time, and a boolean Malformed column for rows where
+    either failed to parse. Author and Status become categoricals. The
+    number of malformed rows is kept in df.attrs["malformed_rows"].
+    """
+    # Short rows (e.g. without an ID column) are padded, extra cells dropped
+    df = pd.DataFrame(rows or []).reindex(columns=range(len(COLUMNS)))
+    df.columns = COLUMNS
+    df[COLUMNS] = df[COLUMNS].fillna("").astype(str)
+
+    coords = df["Location"].str.extract(LOCATION_PATTERN)
+    df["Lat"] = pd.to_numeric(coords[0], errors="coerce").astype(np.float64)
+    df["Lng"] = pd.to_numeric(coords[1], errors="coerce").astype(np.float64)
+    df["Timestamp"] = pd.to_datetime(
+        df["Date"] + " " + df["Time"], format="%Y-%m-%d %H:%M:%S", errors="coerce"
+    )
+    df["Author"] = df["Author"].astype("category")
+    df["Status"] = df["Status"].astype("category")
+    df["Malformed"] = df["Lat"].isna() | df["Lng"].isna() | df["Timestamp"].isna()
+    df.attrs["malformed_rows"] = int(df["Malformed"].sum())
+    return df
+
+
+@metrics.timed("frame_filter")
+def filter_complaint_frame(
+    df, author=None, status=None, date_from=None, date_to=None
+):
+    """Apply the storage fetch filters to an already loaded frame."""
+    mask = np.ones(len(df), dtype=bool)
+    if author is not None:
+        mask &= (df["Author"] == author).to_numpy()
+    if status is not None:
+        mask &= (df["Status"] == status).to_numpy()
+    if date_from is not None:
+        mask &= (df["Date"] >= date_from).to_numpy()
+    if date_to is not None:
+        mask &= (df["Date"] <= date_to).to_numpy()
+    if mask.all():
+        return df
+    return df[mask]
+
+
+def append_complaint_frame(df, rows):
+    """Return df with rows parsed and appended, keeping categorical dtypes."""
+    new = load_complaint_frame(rows)
+    combined = pd.concat([df, new], ignore_index=True)
+    for column in ("Author", "Status"):
+        combined[column] = union_categoricals(
+            [df[column], new[column]], ignore_order=True
+        )
+    combined.attrs["malformed_rows"] = int(combined["Malformed"].sum())
+    return combined
+
+
+def set_frame_status(df, positions, new_status):
+    """Return a copy of df with Status set at the given row positions."""
+    df = df.copy()
+    if new_status not in df["Status"].cat.categories:
+        df["Status"] = df["Status"].cat.add_categories([new_status])
+    df.loc[df.index[positions], "Status"] = new_status
+    return df
+
+
+def _update_frame(df, snapshot, event, change):
+    if event == "append":
+        return append_complaint_frame(df, change[1])
+    positions, new_status = change
+    return set_frame_status(df, positions, new_status)
+
+
+register_derived(
+    "frame", lambda snapshot: load_complaint_frame(snapshot.rows), _update_frame
+)
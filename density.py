@@ -0,0 +1,92 @@
+import math
+import os
+
+import numpy as np
+
+import metrics
+from spatial_index import GRID_REF_LAT, METERS_PER_DEG_LAT
+
+
+# "hex" or "square"
+DENSITY_GRID = os.getenv("DENSITY_GRID", "hex").lower()
+# Width of a density cell on screen, in pixels, at any zoom
+DENSITY_CELL_PX = int(os.getenv("DENSITY_CELL_PX", "32"))
+# Web Mercator meters per pixel at zoom 0 on the equator
+METERS_PER_PIXEL_Z0 = 156543.03392
+_SQRT3 = math.sqrt(3)
+
+
+def cell_size_m(zoom, lat=GRID_REF_LAT, cell_px=DENSITY_CELL_PX):
+    """Ground width in meters of a cell cell_px wide on screen at zoom."""
+    return cell_px * METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / 2**zoom
+
+
+def _hex_round(q, r):
+    # Round fractional axial coordinates to the hexagon containing them
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+@metrics.timed("density_bin")
+def bin_points(
+    lats, lngs, codes, n_codes, cell_m, grid=DENSITY_GRID, ref_lat=GRID_REF_LAT
+):
+    """
+    Count points per grid cell and status code.
+
+    codes are integer status codes in 0..n_codes-1, e.g. a categorical's
+    codes. Coordinates are projected to meters around ref_lat; a cell is a
+    pointy-top hexagon or a square cell_m wide. Points with a NaN
+    coordinate or a negative code are skipped. Returns (polygons, counts):
+    for every occupied cell its corners as [lat, lng] pairs, and an array
+    with counts[i, j] the points of cell i with code j.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    codes = np.asarray(codes, dtype=np.int64)
+    valid = ~(np.isnan(lats) | np.isnan(lngs)) & (codes >= 0)
+    if not valid.any():
+        return [], np.zeros((0, n_codes), dtype=np.int64)
+    codes = codes[valid]
+    meters_per_deg_lng = METERS_PER_DEG_LAT * math.cos(math.radians(ref_lat))
+    x = lngs[valid] * meters_per_deg_lng
+    y = lats[valid] * METERS_PER_DEG_LAT
+
+    if grid == "hex":
+        size = cell_m / _SQRT3  # center to corner
+        col, row = _hex_round((_SQRT3 / 3 * x - y / 3) / size, (2 / 3 * y) / size)
+    elif grid == "square":
+        col = np.floor(x / cell_m).astype(np.int64)
+        row = np.floor(y / cell_m).astype(np.int64)
+    else:
+        raise ValueError(f"Invalid grid: {grid}. Valid grids are: ['hex', 'square']")
+
+    # One integer key per cell is much faster to np.unique than (col, row) pairs
+    col0, row0 = col.min(), row.min()
+    height = row.max() - row0 + 1
+    keys, inverse = np.unique((col - col0) * height + (row - row0), return_inverse=True)
+    counts = np.bincount(
+        inverse * n_codes + codes, minlength=len(keys) * n_codes
+    ).reshape(len(keys), n_codes)
+
+    col = (keys // height + col0).astype(np.float64)
+    row = (keys % height + row0).astype(np.float64)
+    if grid == "hex":
+        cx = size * _SQRT3 * (col + row / 2)
+        cy = size * 1.5 * row
+        angles = np.radians(np.arange(6) * 60 - 30)
+        corner_x = cx[:, None] + size * np.cos(angles)
+        corner_y = cy[:, None] + size * np.sin(angles)
+    else:
+        corner_x = (col[:, None] + np.array([0, 1, 1, 0])) * cell_m
+        corner_y = (row[:, None] + np.array([0, 0, 1, 1])) * cell_m
+    polygons = np.stack(
+        [corner_y / METERS_PER_DEG_LAT, corner_x / meters_per_deg_lng], axis=2
+    )
+    return polygons.tolist(), counts
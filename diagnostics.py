@@ -0,0 +1,50 @@
+import streamlit as st
+
+import metrics
+import utils
+from storage import SheetsBackend
+
+
+def render_diagnostics(backend):
+    """
+    Sidebar panel with stage timings, API counters and cache stats.
+    Shown only when METRICS_ENABLED is set; also refreshes the metrics file.
+    Timings are cumulative for the process, so a rerun's own stages show
+    up on the next rerun.
+    """
+    if not metrics.enabled():
+        return
+    import pandas as pd
+
+    from map_render import map_cache
+
+    metrics.write_metrics_file()
+    spans, counters = metrics.snapshot()
+    with st.sidebar.expander("Diagnostics"):
+        if spans:
+            timings = pd.DataFrame.from_dict(spans, orient="index").sort_values(
+                "total_s", ascending=False
+            )
+            st.dataframe(
+                (timings[["count", "last_s", "mean_s", "max_s"]] * [1, 1000, 1000, 1000])
+                .rename(columns={"last_s": "last ms", "mean_s": "mean ms", "max_s": "max ms"})
+                .round(1),
+                use_container_width=True,
+            )
+        else:
+            st.caption("No timings recorded yet.")
+        if counters:
+            st.write("Counters")
+            st.json(counters)
+        gauges = metrics.gauges()
+        if gauges:
+            st.write("Quota headroom")
+            st.json(gauges)
+        st.write("Cache")
+        st.json(utils.cache_stats())
+        st.write("Rendered maps")
+        st.json(map_cache.stats())
+        if isinstance(backend, SheetsBackend):
+            st.write("Sheets client")
+            st.json(utils.client_stats())
+        st.caption(f"Prometheus metrics: {metrics.METRICS_FILE}")
@@ -0,0 +1,192 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+import metrics
+from complaint_cache import register_derived
+
+
+# Facet name -> column of the snapshot rows
+FACETS = {"author": 0, "date": 3, "status": 6}
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+# One facet's value -> sorted int64 positions, values by code, value -> code
+# and the int64 code of every row
+_Facet = namedtuple("_Facet", ["postings", "values", "lookup", "codes"])
+# Everything a read needs, swapped in whole by each write
+_State = namedtuple("_State", ["size", "facets", "dates"])
+
+
+class FacetIndex:
+    """
+    Inverted index from each author, status and date to the sorted row
+    positions holding it, plus every row's value code per facet.
+
+    A combined filter intersects the position arrays of its values,
+    smallest first, so it costs about as much as the rows it matches.
+    Facet counts for a filter are a bincount of the matching rows' codes.
+
+    Writes run on the submit-queue thread while pages read. A write copies
+    the containers it changes and swaps them in with one assignment of
+    _state, and every read takes _state once, so readers never see a dict
+    change size or codes that do not match the values list.
+    """
+
+    def __init__(self, rows):
+        facets = {}
+        for facet, column in FACETS.items():
+            lookup = {}
+            codes = np.fromiter(
+                (lookup.setdefault(row[column], len(lookup)) for row in rows),
+                np.int64,
+                len(rows),
+            )
+            # A stable sort keeps each value's positions in order
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(lookup) + 1))
+            postings = {
+                value: order[bounds[code] : bounds[code + 1]]
+                for value, code in lookup.items()
+            }
+            facets[facet] = _Facet(postings, list(lookup), lookup, codes)
+        self._state = _State(len(rows), facets, sorted(facets["date"].postings))
+
+    @property
+    def size(self):
+        return self._state.size
+
+    def append(self, start, rows):
+        state = self._state
+        facets = dict(state.facets)
+        positions = list(range(start, start + len(rows)))
+        for facet, column in FACETS.items():
+            old = facets[facet]
+            postings = dict(old.postings)
+            values = list(old.values)
+            lookup = dict(old.lookup)
+            new = {}
+            codes = []
+            for position, row in zip(positions, rows):
+                value = row[column]
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(values)
+                    values.append(value)
+                codes.append(code)
+                new.setdefault(value, []).append(position)
+            for value, added in new.items():
+                postings[value] = np.concatenate([postings.get(value, _EMPTY), added])
+            codes = np.concatenate([old.codes, np.array(codes, dtype=np.int64)])
+            facets[facet] = _Facet(postings, values, lookup, codes)
+        dates = state.dates
+        if len(facets["date"].values) != len(state.facets["date"].values):
+            dates = sorted(facets["date"].postings)
+        self._state = _State(start + len(rows), facets, dates)
+
+    def set_status(self, positions, new_status):
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        if not len(positions):
+            return
+        state = self._state
+        old = state.facets["status"]
+        postings = dict(old.postings)
+        values = list(old.values)
+        lookup = dict(old.lookup)
+        new_code = lookup.get(new_status)
+        if new_code is None:
+            new_code = lookup[new_status] = len(values)
+            values.append(new_status)
+        for old_code in np.unique(old.codes[positions]).tolist():
+            if old_code != new_code:
+                value = values[old_code]
+                postings[value] = np.setdiff1d(
+                    postings[value], positions, assume_unique=True
+                )
+        postings[new_status] = np.union1d(postings.get(new_status, _EMPTY), positions)
+        codes = old.codes.copy()
+        codes[positions] = new_code
+        facets = dict(state.facets)
+        facets["status"] = _Facet(postings, values, lookup, codes)
+        self._state = state._replace(facets=facets)
+
+    def values(self, facet):
+        """Sorted distinct non-empty values that some row holds."""
+        postings = self._state.facets[facet].postings
+        return sorted(v for v, p in postings.items() if v and len(p))
+
+    @staticmethod
+    def _date_range(state, date_from, date_to):
+        dates = state.dates
+        postings = state.facets["date"].postings
+        lo = 0 if date_from is None else bisect_left(dates, date_from)
+        hi = len(dates) if date_to is None else bisect_right(dates, date_to)
+        arrays = [postings[d] for d in dates[lo:hi]]
+        if not arrays:
+            return _EMPTY
+        # Dates hold disjoint positions, so sorting the union is enough
+        return np.sort(np.concatenate(arrays))
+
+    def positions(self, author=None, status=None, date_from=None, date_to=None):
+        """Sorted int64 positions of the rows matching every given filter."""
+        return self._positions(self._state, author, status, date_from, date_to)
+
+    def _positions(self, state, author, status, date_from, date_to):
+        facets = state.facets
+        arrays = []
+        if author is not None:
+            arrays.append(facets["author"].postings.get(author, _EMPTY))
+        if status is not None:
+            arrays.append(facets["status"].postings.get(status, _EMPTY))
+        if date_from is not None and date_from == date_to:
+            arrays.append(facets["date"].postings.get(date_from, _EMPTY))
+        elif date_from is not None or date_to is not None:
+            arrays.append(self._date_range(state, date_from, date_to))
+        if not arrays:
+            return np.arange(state.size, dtype=np.int64)
+        arrays.sort(key=len)
+        matches = arrays[0]
+        for array in arrays[1:]:
+            if not len(matches):
+                break
+            matches = np.intersect1d(matches, array, assume_unique=True)
+        return matches
+
+    def counts(self, facet, author=None, status=None, date_from=None, date_to=None):
+        """
+        Rows per value of facet among the rows matching the other filters;
+        the facet's own filter is ignored, so every option keeps a count.
+        Only values with rows are returned.
+        """
+        state = self._state
+        index = state.facets[facet]
+        filters = {"author": author, "status": status}
+        if facet in filters:
+            filters[facet] = None
+        else:
+            date_from = date_to = None
+        if not any(filters.values()) and date_from is None and date_to is None:
+            return {v: len(p) for v, p in index.postings.items() if len(p)}
+        matches = self._positions(
+            state, date_from=date_from, date_to=date_to, **filters
+        )
+        counts = np.bincount(index.codes[matches], minlength=len(index.values))
+        return {
+            index.values[code]: int(n) for code, n in enumerate(counts.tolist()) if n
+        }
+
+
+@metrics.timed("facet_build")
+def _build_facets(snapshot):
+    return FacetIndex(snapshot.rows)
+
+
+def _update_facets(index, snapshot, event, change):
+    if event == "append":
+        index.append(*change)
+    else:
+        index.set_status(*change)
+    return index
+
+
+register_derived("facets", _build_facets, _update_facets)
@@ -0,0 +1,272 @@
+import json
+import re
+import threading
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import metrics
+from complaint import COLUMNS
+from sheets_client import method_name
+
+
+_A1 = re.compile(r"^(?:'?(?P<sheet>(?:[^']|'')+?)'?!)?(?P<cells>[A-Z0-9:]+)$")
+_CELL = re.compile(r"^(?P<col>[A-Z]*)(?P<row>\d*)$")
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def _column_letters(number):
+    letters = ""
+    while number:
+        number, rest = divmod(number - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+def parse_a1(range_name, default_sheet):
+    """
+    Split an A1 range into (sheet, first_row, last_row, first_col, last_col).
+    Rows and columns are 1-based; open ends are None.
+    """
+    match = _A1.match(range_name)
+    if not match:
+        raise ValueError(f"Invalid range: {range_name}")
+    sheet = (match.group("sheet") or default_sheet).replace("''", "'")
+    parts = match.group("cells").split(":")
+    start = _CELL.match(parts[0])
+    end = _CELL.match(parts[-1])
+    first_row = int(start.group("row")) if start.group("row") else 1
+    last_row = int(end.group("row")) if end.group("row") else None
+    first_col = _column_number(start.group("col")) if start.group("col") else 1
+    last_col = _column_number(end.group("col")) if end.group("col") else None
+    return sheet, first_row, last_row, first_col, last_col
+
+
+def _error(status, message):
+    response = httplib2.Response({"status": status})
+    response.reason = message
+    return HttpError(response, message.encode())
+
+
+class FakeRequest:
+    def __init__(self, sheets, handler, method_id, uri=None):
+        self._sheets = sheets
+        self._handler = handler
+        self.methodId = f"sheets.spreadsheets.{method_id}"
+        # Identifies identical reads, like the real request's URL
+        self.uri = uri
+
+    def execute(self, http=None, num_retries=0):
+        return self._sheets._call(self._handler)
+
+
+class FakeSheets:
+    """
+    In-memory stand-in for the Sheets v4 API surface this app uses:
+    spreadsheets().get/batchUpdate and spreadsheets().values()
+    get/batchGet/append/update/batchUpdate. Every request sleeps latency
+    seconds to simulate the network round trip, plus the response size
+    divided by bandwidth (bytes per second) if one is given.
+
+    A tab's grid has grid_rows rows, or as many as it holds data if that
+    is more; like the real API, a read starting below the grid fails.
+    """
+
+    def __init__(
+        self, latency=0.0, title="Sheet1", header=None, bandwidth=None, grid_rows=1000
+    ):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.grid_rows = grid_rows
+        self.tabs = {title: [list(header or COLUMNS)]}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.bytes_sent = 0
+
+    # --- request plumbing -------------------------------------------------
+
+    def _call(self, handler):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            result = handler()
+        size = len(json.dumps(result))
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+        self.bytes_sent += size
+        metrics.inc("sheets_bytes_received", size)
+        return result
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return _FakeValues(self)
+
+    def get(self, spreadsheetId=None, fields=None, **kwargs):
+        def handler():
+            return {"sheets": [{"properties": {"title": t}} for t in self.tabs]}
+
+        return FakeRequest(self, handler, "get", f"get?fields={fields}")
+
+    def batchUpdate(self, spreadsheetId=None, body=None):
+        def handler():
+            replies = []
+            for request in body.get("requests", []):
+                if "addSheet" in request:
+                    title = request["addSheet"]["properties"]["title"]
+                    if title in self.tabs:
+                        raise ValueError(f"Sheet already exists: {title}")
+                    self.tabs[title] = []
+                    replies.append({"addSheet": {"properties": {"title": title}}})
+                else:
+                    replies.append({})
+            return {"replies": replies}
+
+        return FakeRequest(self, handler, "batchUpdate")
+
+    # --- helpers ----------------------------------------------------------
+
+    def load_rows(self, rows, title=None):
+        """Append data rows directly, without a simulated request."""
+        self.tabs[title or next(iter(self.tabs))].extend(list(r) for r in rows)
+
+    def _read(self, range_name):
+        sheet, first_row, last_row, first_col, last_col = parse_a1(
+            range_name, next(iter(self.tabs))
+        )
+        grid = self.tabs[sheet]
+        if first_row > max(self.grid_rows, len(grid)):
+            raise _error(400, f"Range ({range_name}) exceeds grid limits")
+        end = len(grid) if last_row is None else min(last_row, len(grid))
+        rows = []
+        for row in grid[first_row - 1 : end]:
+            cells = row[first_col - 1 : last_col]
+            # Like the real API, trailing empty cells and rows are dropped
+            while cells and cells[-1] == "":
+                cells = cells[:-1]
+            rows.append(cells)
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _write(self, range_name, values):
+        sheet, first_row, _, first_col, _ = parse_a1(range_name, next(iter(self.tabs)))
+        grid = self.tabs[sheet]
+        cells = 0
+        for r, row in enumerate(values):
+            index = first_row - 1 + r
+            while len(grid) <= index:
+                grid.append([])
+            target = grid[index]
+            for c, value in enumerate(row):
+                col = first_col - 1 + c
+                while len(target) <= col:
+                    target.append("")
+                target[col] = value
+                cells += 1
+        return cells
+
+
+class _FakeValues:
+    def __init__(self, sheets):
+        self._sheets = sheets
+
+    def get(self, spreadsheetId=None, range=None, fields=None, **kwargs):
+        def handler():
+            result = {"values": self._sheets._read(range)}
+            if fields != "values":
+                result["range"] = range
+                result["majorDimension"] = "ROWS"
+            return result
+
+        return FakeRequest(
+            self._sheets, handler, "values.get", f"values/{range}?fields={fields}"
+        )
+
+    def batchGet(self, spreadsheetId=None, ranges=None, **kwargs):
+        def handler():
+            return {
+                "valueRanges": [
+                    {"range": r, "values": self._sheets._read(r)} for r in ranges
+                ]
+            }
+
+        uri = f"values:batchGet?ranges={ranges}&fields={kwargs.get('fields')}"
+        return FakeRequest(self._sheets, handler, "values.batchGet", uri)
+
+    def append(self, spreadsheetId=None, range=None, body=None, **kwargs):
+        def handler():
+            sheets = self._sheets
+            sheet = parse_a1(range, next(iter(sheets.tabs)))[0]
+            grid = sheets.tabs[sheet]
+            start = len(grid) + 1
+            values = body["values"]
+            grid.extend(list(row) for row in values)
+            width = max((len(row) for row in values), default=1)
+            title = sheet.replace("'", "''")
+            return {
+                "updates": {
+                    "updatedRange": f"'{title}'!A{start}:"
+                    f"{_column_letters(width)}{start + len(values) - 1}",
+                    "updatedRows": len(values),
+                    "updatedCells": sum(len(row) for row in values),
+                }
+            }
+
+        return FakeRequest(self._sheets, handler, "values.append")
+
+    def update(self, spreadsheetId=None, range=None, body=None, **kwargs):
+        def handler():
+            return {"updatedCells": self._sheets._write(range, body["values"])}
+
+        return FakeRequest(self._sheets, handler, "values.update")
+
+    def batchUpdate(self, spreadsheetId=None, body=None):
+        def handler():
+            total = sum(
+                self._sheets._write(d["range"], d["values"]) for d in body["data"]
+            )
+            return {"totalUpdatedCells": total}
+
+        return FakeRequest(self._sheets, handler, "values.batchUpdate")
+
+
+class FakeSheetsClient:
+    """
+    Drop-in for sheets_client.SheetsClient backed by FakeSheets. Requests
+    go through scheduler (a sheets_scheduler.QuotaScheduler) if one is
+    given, and straight to the fake otherwise.
+    """
+
+    def __init__(self, sheets, scheduler=None):
+        self.sheets = sheets
+        self.scheduler = scheduler
+
+    def service(self):
+        return self.sheets
+
+    def execute(self, request):
+        if self.scheduler is None:
+            return self._send(request)
+        return self.scheduler.run(request, method_name(request), self._send)
+
+    def _send(self, request):
+        method = method_name(request)
+        metrics.inc("sheets_api_calls", method=method)
+        with metrics.span(f"sheets.{method}"):
+            return request.execute()
+
+    def snapshot_stats(self):
+        stats = {"calls": self.sheets.calls, "bytes": self.sheets.bytes_sent}
+        if self.scheduler is not None:
+            stats["quota"] = self.scheduler.snapshot_stats()
+        return stats
@@ -0,0 +1,229 @@
+import math
+import os
+import threading
+
+import folium
+from branca.colormap import linear
+from cachetools import LRUCache
+from folium.plugins import FastMarkerCluster
+
+import metrics
+from density import bin_points
+
+
+# Above this many markers a layer is sent as one clustered data array
+MAP_CLUSTER_THRESHOLD = int(os.getenv("MAP_CLUSTER_THRESHOLD", "500"))
+# Rendered maps kept per process, across every session
+MAP_CACHE_SIZE = int(os.getenv("MAP_CACHE_SIZE", "32"))
+
+# Builds each marker in the browser; the popup HTML is only turned into
+# DOM when the marker is clicked
+CLUSTER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({
+        icon: "exclamation",
+        prefix: "fa",
+        markerColor: "red",
+        iconColor: "white"
+    });
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindTooltip(row[2]);
+    marker.bindPopup(function () { return row[3]; }, {maxWidth: 300});
+    return marker;
+}
+"""
+
+
+@metrics.timed("popup_html")
+def location_records(df):
+    """
+    One record per distinct location: [lat, lng, tooltip, popup_html].
+    Complaints sharing a location are listed together in one popup.
+    df is a typed frame from load_complaint_frame.
+    """
+    df = df[df["Lat"].notna() & df["Lng"].notna()]
+    if df.empty:
+        return []
+    popup = (
+        "<b>" + df["Problem Title"] + "</b> ("
+        + df["Status"].astype(str) + ")<br>" + df["Description"]
+    )
+    grouped = (
+        df.assign(Popup=popup)
+        .groupby("Location", sort=False)
+        .agg(
+            Lat=("Lat", "first"),
+            Lng=("Lng", "first"),
+            Count=("Lat", "size"),
+            Title=("Problem Title", "first"),
+            Popup=("Popup", "<br>".join),
+        )
+    )
+    tooltip = grouped["Title"].where(grouped["Count"] == 1, "Multiple problems")
+    return [
+        list(record)
+        for record in zip(
+            grouped["Lat"].tolist(),
+            grouped["Lng"].tolist(),
+            tooltip.tolist(),
+            grouped["Popup"].tolist(),
+        )
+    ]
+
+
+@metrics.timed("popup_html")
+def title_records(df):
+    """One record per complaint, titled by its problem title."""
+    df = df[df["Lat"].notna() & df["Lng"].notna()]
+    return [
+        [lat, lng, title, title]
+        for lat, lng, title in zip(
+            df["Lat"].tolist(), df["Lng"].tolist(), df["Problem Title"].tolist()
+        )
+    ]
+
+
+def add_marker_layer(m, records, name, threshold=MAP_CLUSTER_THRESHOLD):
+    """
+    Return a FeatureGroup of individual markers for st_folium's
+    feature_group_to_add. Above threshold markers the records are instead
+    added to m as a single FastMarkerCluster layer and None is returned.
+    """
+    if len(records) > threshold:
+        FastMarkerCluster(records, callback=CLUSTER_CALLBACK, name=name).add_to(m)
+        return None
+    fg = folium.FeatureGroup(name=name)
+    for lat, lng, tooltip, popup in records:
+        fg.add_child(
+            folium.Marker(
+                location=[lat, lng],
+                draggable=False,
+                popup=folium.Popup(popup, max_width=300),
+                tooltip=tooltip,
+                icon=folium.Icon(
+                    icon="exclamation", prefix="fa", color="red", icon_color="white"
+                ),
+            )
+        )
+    return fg
+
+
+def render_marker_map(records, name, location, zoom_start=16):
+    """Render a map with one marker layer to a standalone HTML page."""
+    m = folium.Map(location=location, zoom_start=zoom_start)
+    fg = add_marker_layer(m, records, name)
+    if fg is not None:
+        fg.add_to(m)
+    with metrics.span("folium_render"):
+        return m.get_root().render()
+
+
+def density_cells(df, cell_m):
+    """
+    GeoJSON FeatureCollection with one polygon per occupied density cell
+    of df's coordinates. Properties hold the cell's Total, its count per
+    status and a fill color scaled to the busiest cell, so the size of the
+    collection depends on the number of cells, not of complaints.
+    df is a typed frame from load_complaint_frame.
+    """
+    statuses = df["Status"].cat
+    names = [str(name) for name in statuses.categories]
+    polygons, counts = bin_points(
+        df["Lat"].to_numpy(), df["Lng"].to_numpy(), statuses.codes.to_numpy(),
+        len(names), cell_m,
+    )
+    totals = counts.sum(axis=1)
+    # Square root so one crowded building does not wash out the rest
+    colors = linear.YlOrRd_09.scale(0, math.sqrt(totals.max()) if len(totals) else 1)
+    # Every cell lists the same statuses, as the tooltip needs in folium
+    present = [j for j, n in enumerate(counts.sum(axis=0).tolist()) if n]
+    features = []
+    for corners, cell, total in zip(polygons, counts.tolist(), totals.tolist()):
+        properties = {"Total": total}
+        properties.update((names[j], cell[j]) for j in present)
+        properties["color"] = colors(math.sqrt(total))
+        features.append(
+            {
+                "type": "Feature",
+                # GeoJSON rings are [lng, lat] and closed
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[lng, lat] for lat, lng in corners + corners[:1]]],
+                },
+                "properties": properties,
+            }
+        )
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _cell_style(feature):
+    return {
+        "fillColor": feature["properties"]["color"],
+        "color": "#7f2704",
+        "weight": 0.5,
+        "fillOpacity": 0.6,
+    }
+
+
+def density_layer(cells, name="Density"):
+    """FeatureGroup drawing density_cells() with a per-status count tooltip."""
+    fg = folium.FeatureGroup(name=name)
+    if cells["features"]:
+        fields = [k for k in cells["features"][0]["properties"] if k != "color"]
+        folium.GeoJson(
+            cells,
+            style_function=_cell_style,
+            tooltip=folium.GeoJsonTooltip(fields=fields),
+        ).add_to(fg)
+    return fg
+
+
+class RenderedMapCache:
+    """
+    Process-wide LRU of rendered map HTML (and density cells), keyed by the
+    data snapshot version plus whatever picks the markers (filters,
+    selected date, zoom).
+
+    Once a newer snapshot version is seen, every entry rendered from an
+    older one is dropped. A session still holding an older snapshot gets a
+    fresh render that is not stored.
+    """
+
+    def __init__(self, maxsize=MAP_CACHE_SIZE):
+        self._data = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, version, key, build):
+        """Return the cached value for (version, key), calling build() on a miss."""
+        with self._lock:
+            if self._version is None or version > self._version:
+                self.evictions += len(self._data)
+                self._data.clear()
+                self._version = version
+            if version == self._version and key in self._data:
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        # Built outside the lock so other maps are not held up
+        value = build()
+        with self._lock:
+            if version == self._version:
+                self._data[key] = value
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "version": self._version,
+            }
+
+
+map_cache = RenderedMapCache()
@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.getenv("METRICS_FILE", "metrics.prom")
+# Minimum seconds between two writes of the metrics file
+METRICS_WRITE_INTERVAL = float(os.getenv("METRICS_WRITE_INTERVAL", "5"))
+PREFIX = "complaints"
+
+_lock = threading.Lock()
+# span name -> [count, total_seconds, max_seconds, last_seconds]
+_spans = {}
+# (counter name, sorted label items) -> value
+_counters = {}
+# gauge name -> callable returning [(labels dict, value), ...]
+_gauges = {}
+_last_write = 0.0
+_NOOP = nullcontext()
+
+
+def enabled():
+    return METRICS_ENABLED
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stats = _spans.get(self.name)
+            if stats is None:
+                _spans[self.name] = [1, elapsed, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[3] = elapsed
+                if elapsed > stats[2]:
+                    stats[2] = elapsed
+        return False
+
+
+def span(name):
+    """Time a block: `with span("folium_render"): ...`. A shared no-op when disabled."""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _Span(name)
+
+
+def timed(name):
+    """Decorator form of span()."""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inc(name, value=1, **labels):
+    """Add value to a counter, e.g. inc("sheets_api_calls", method="get")."""
+    if not METRICS_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _display_name(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def gauge(name, read):
+    """
+    Register a gauge whose values are read when metrics are exported:
+    read() returns a list of (labels dict, value) pairs.
+    """
+    with _lock:
+        _gauges[name] = read
+
+
+def gauges():
+    """Return the current gauge values, keyed like snapshot()'s counters."""
+    with _lock:
+        readers = dict(_gauges)
+    values = {}
+    for name, read in readers.items():
+        for labels, value in read():
+            values[_display_name(name, sorted(labels.items()))] = value
+    return values
+
+
+def snapshot():
+    """Return (spans, counters) copies for display."""
+    with _lock:
+        spans = {
+            name: {
+                "count": s[0],
+                "total_s": s[1],
+                "mean_s": s[1] / s[0],
+                "max_s": s[2],
+                "last_s": s[3],
+            }
+            for name, s in _spans.items()
+        }
+        counters = {
+            _display_name(name, labels): value
+            for (name, labels), value in _counters.items()
+        }
+    return spans, counters
+
+
+def _labels(items):
+    if not items:
+        return ""
+    escaped = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in items
+    )
+    return "{" + escaped + "}"
+
+
+def to_prometheus():
+    """Render all spans, counters and gauges in the Prometheus text exposition format."""
+    with _lock:
+        spans = {name: list(s) for name, s in _spans.items()}
+        counters = dict(_counters)
+        readers = dict(_gauges)
+    lines = []
+    if spans:
+        metric = f"{PREFIX}_span_seconds"
+        lines.append(f"# HELP {metric} Time spent in instrumented stages.")
+        lines.append(f"# TYPE {metric} summary")
+        for name, (count, total, _, _) in sorted(spans.items()):
+            labels = _labels([("span", name)])
+            lines.append(f"{metric}_sum{labels} {total:.6f}")
+            lines.append(f"{metric}_count{labels} {count}")
+        metric = f"{PREFIX}_span_max_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        for name, (_, _, longest, _) in sorted(spans.items()):
+            lines.append(f"{metric}{_labels([('span', name)])} {longest:.6f}")
+    names = sorted({name for name, _ in counters})
+    for name in names:
+        metric = f"{PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for (counter, labels), value in sorted(counters.items()):
+            if counter == name:
+                lines.append(f"{metric}{_labels(labels)} {value}")
+    for name, read in sorted(readers.items()):
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        for labels, value in read():
+            lines.append(f"{metric}{_labels(sorted(labels.items()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path=METRICS_FILE, force=False):
+    """Write to_prometheus() to path, at most once per METRICS_WRITE_INTERVAL."""
+    global _last_write
+    if not METRICS_ENABLED:
+        return False
+    now = time.monotonic()
+    if not force and now - _last_write < METRICS_WRITE_INTERVAL:
+        return False
+    _last_write = now
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(to_prometheus())
+    # Readers such as node_exporter never see a half-written file
+    os.replace(tmp_path, path)
+    return True
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
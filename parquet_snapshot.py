@@ -0,0 +1,131 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from complaint import COLUMNS, parse_location
+
+
+# Parts are merged into one file once there are more than this many
+PARQUET_MAX_PARTS = int(os.getenv("PARQUET_MAX_PARTS", "32"))
+
+SCHEMA = pa.schema(
+    [("Row", pa.int64())]
+    + [(column, pa.string()) for column in COLUMNS]
+    + [("Lat", pa.float64()), ("Lng", pa.float64())]
+)
+# Starts with "_" so pyarrow and pandas skip it when reading the directory
+META_FILE = "_meta.json"
+
+
+class ParquetSnapshot:
+    """
+    Local copy of the normalized complaint rows as a directory of Parquet
+    files, one part per append. Row is the sheet row number, so the next
+    fetch only needs the rows after the last one stored. Lat and Lng are
+    parsed once for analysts reading the directory with pandas or pyarrow.
+
+    _meta.json names the sheet the rows came from; a snapshot of another
+    spreadsheet or tab is ignored. version goes up on every change.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        os.makedirs(path, exist_ok=True)
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def _meta(self):
+        try:
+            with open(os.path.join(self.path, META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @property
+    def version(self):
+        return self._meta().get("version", 0)
+
+    def _write_meta(self):
+        meta = {"source": self.source, "version": self.version + 1}
+        self._replace(META_FILE, lambda tmp: _write_json(tmp, meta))
+
+    def _replace(self, name, write):
+        # Written under a temporary name, then renamed into place
+        target = os.path.join(self.path, name)
+        tmp = os.path.join(self.path, f".{name}.tmp")
+        write(tmp)
+        os.replace(tmp, target)
+
+    def _write_part(self, rows, first_row):
+        parts = self._parts()
+        number = int(os.path.basename(parts[-1])[5:11]) + 1 if parts else 0
+        table = _to_table(rows, first_row)
+        self._replace(
+            f"part-{number:06d}.parquet", lambda tmp: pq.write_table(table, tmp)
+        )
+
+    def load(self):
+        """
+        Return the stored rows, positions matching the sheet from row 2, or
+        None if there is no usable snapshot for this source.
+        """
+        parts = self._parts()
+        if not parts or self._meta().get("source") != self.source:
+            return None
+        try:
+            table = pa.concat_tables(
+                pq.read_table(part, columns=["Row", *COLUMNS], memory_map=True)
+                for part in parts
+            ).sort_by("Row")
+        except (OSError, pa.ArrowException):
+            return None
+        numbers = table.column("Row").to_numpy()
+        # Rows must run 2, 3, ... without gaps, or the snapshot is unusable
+        if not np.array_equal(numbers, np.arange(2, len(numbers) + 2)):
+            return None
+        # Much faster than to_pylist() for string columns
+        columns = [
+            table.column(column).to_numpy(zero_copy_only=False).tolist()
+            for column in COLUMNS
+        ]
+        return [list(row) for row in zip(*columns)]
+
+    def append(self, rows, first_row):
+        """Store rows starting at sheet row first_row as a new part."""
+        if not rows:
+            return
+        if len(self._parts()) >= PARQUET_MAX_PARTS:
+            stored = self.load() or []
+            self.replace(stored + list(rows))
+            return
+        self._write_part(rows, first_row)
+        self._write_meta()
+
+    def replace(self, rows):
+        """Rewrite the snapshot as one part holding rows from sheet row 2."""
+        old_parts = self._parts()
+        self._write_part(rows, 2)
+        for part in old_parts:
+            os.remove(part)
+        self._write_meta()
+
+
+def _write_json(path, value):
+    with open(path, "w") as f:
+        json.dump(value, f)
+
+
+def _to_table(rows, first_row):
+    columns = {"Row": pa.array(range(first_row, first_row + len(rows)), pa.int64())}
+    for index, column in enumerate(COLUMNS):
+        columns[column] = pa.array([row[index] for row in rows], pa.string())
+    points = [parse_location(row[5]) for row in rows]
+    columns["Lat"] = pa.array([lat for lat, _ in points], pa.float64())
+    columns["Lng"] = pa.array([lng for _, lng in points], pa.float64())
+    return pa.table(columns, schema=SCHEMA)
@@ -0,0 +1,170 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from googleapiclient.errors import HttpError
+
+import metrics
+from sheets_scheduler import QuotaScheduler
+
+
+# Refresh the access token this long before it actually expires
+REFRESH_MARGIN = timedelta(seconds=int(os.getenv("SHEETS_REFRESH_MARGIN", "300")))
+# Number of keep-alive HTTP connections shared by all sessions
+HTTP_POOL_SIZE = int(os.getenv("SHEETS_HTTP_POOL_SIZE", "4"))
+HTTP_TIMEOUT = int(os.getenv("SHEETS_HTTP_TIMEOUT", "30"))
+
+
+def method_name(request):
+    """Short API method name of a request, e.g. "values.get"."""
+    method = getattr(request, "methodId", None) or "unknown"
+    return method.replace("sheets.spreadsheets.", "")
+
+
+_metered_http_class = None
+
+
+def metered_http(creds):
+    """
+    AuthorizedHttp that counts request and response bytes. The HTTP and
+    auth transport modules are only imported once a connection is needed.
+    """
+    global _metered_http_class
+    import google_auth_httplib2
+    import httplib2
+
+    if _metered_http_class is None:
+
+        class MeteredHttp(google_auth_httplib2.AuthorizedHttp):
+            def request(self, uri, method="GET", body=None, *args, **kwargs):
+                response, content = super().request(uri, method, body, *args, **kwargs)
+                if metrics.METRICS_ENABLED:
+                    if body:
+                        metrics.inc("sheets_bytes_sent", len(body))
+                    metrics.inc("sheets_bytes_received", len(content or b""))
+                return response, content
+
+        _metered_http_class = MeteredHttp
+    return _metered_http_class(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
+
+class SheetsClient:
+    """
+    Process-wide holder for the Sheets service.
+
+    Nothing is loaded or built until the first request: credentials are then
+    loaded once and kept in memory, the discovery document is built once,
+    and requests are executed over a small pool of keep-alive
+    connections. httplib2 connections are not thread-safe, so each request
+    borrows one connection from the pool for the duration of the call.
+    Every request is sent through a QuotaScheduler.
+    """
+
+    def __init__(self, credentials_loader, pool_size=HTTP_POOL_SIZE, scheduler=None):
+        self._credentials_loader = credentials_loader
+        self.scheduler = scheduler or QuotaScheduler()
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+        self._creds = None
+        self._service = None
+        self._pool = queue.LifoQueue()
+        self._created_http = 0
+        self.stats = {
+            "credential_loads": 0,
+            "credential_refreshes": 0,
+            "service_builds": 0,
+            "service_reuses": 0,
+            "http_created": 0,
+            "http_reuses": 0,
+        }
+
+    def _credentials(self):
+        # Caller must hold self._lock
+        if self._creds is None:
+            self._creds = self._credentials_loader()
+            self.stats["credential_loads"] += 1
+        elif self._needs_refresh(self._creds):
+            from google.auth.transport.requests import Request
+
+            with metrics.span("oauth_refresh"):
+                self._creds.refresh(Request())
+            self.stats["credential_refreshes"] += 1
+            if os.path.exists("token.json"):
+                with open("token.json", "w") as token:
+                    token.write(self._creds.to_json())
+        return self._creds
+
+    @staticmethod
+    def _needs_refresh(creds):
+        if not creds.refresh_token:
+            return False
+        if creds.expiry is None:
+            return not creds.valid
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now <= REFRESH_MARGIN
+
+    def service(self):
+        with self._lock:
+            creds = self._credentials()
+            if self._service is None:
+                from googleapiclient.discovery import build
+
+                with metrics.span("service_build"):
+                    self._service = build(
+                        "sheets",
+                        "v4",
+                        credentials=creds,
+                        cache_discovery=False,
+                    )
+                self.stats["service_builds"] += 1
+            else:
+                self.stats["service_reuses"] += 1
+            return self._service
+
+    @contextmanager
+    def _http(self):
+        try:
+            http = self._pool.get_nowait()
+            with self._lock:
+                self.stats["http_reuses"] += 1
+        except queue.Empty:
+            with self._lock:
+                creds = self._credentials()
+                self._created_http += 1
+                self.stats["http_created"] += 1
+            http = metered_http(creds)
+        try:
+            yield http
+        finally:
+            if self._pool.qsize() < self._pool_size:
+                self._pool.put(http)
+
+    def execute(self, request):
+        """
+        Execute a googleapiclient request over a pooled connection, within
+        the API quota and with retries (see sheets_scheduler).
+        """
+        return self.scheduler.run(request, method_name(request), self._send)
+
+    def _send(self, request):
+        with self._lock:
+            # Keep the shared credentials fresh before they are used
+            self._credentials()
+        method = method_name(request)
+        metrics.inc("sheets_api_calls", method=method)
+        try:
+            with metrics.span(f"sheets.{method}"), self._http() as http:
+                return request.execute(http=http)
+        except HttpError as error:
+            metrics.inc("sheets_errors", method=method, status=error.resp.status)
+            raise
+
+    def snapshot_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["http_pooled"] = self._pool.qsize()
+        stats["quota"] = self.scheduler.snapshot_stats()
+        return stats
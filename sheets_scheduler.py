@@ -0,0 +1,221 @@
+import os
+import random
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+import metrics
+
+
+# Per-minute request quotas of the Sheets API (per user per project)
+READ_REQUESTS_PER_MINUTE = int(os.getenv("READ_REQUESTS_PER_MINUTE", "60"))
+WRITE_REQUESTS_PER_MINUTE = int(os.getenv("WRITE_REQUESTS_PER_MINUTE", "60"))
+# Requests that may go out at once before the per-minute rate applies
+QUOTA_BURST = int(os.getenv("SHEETS_QUOTA_BURST", "10"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+# Backoff before retry n is BACKOFF_BASE * 2**n seconds, capped, with jitter
+BACKOFF_BASE = float(os.getenv("SHEETS_BACKOFF_BASE", "1"))
+BACKOFF_MAX = float(os.getenv("SHEETS_BACKOFF_MAX", "32"))
+
+READ_METHODS = {"get", "values.get", "values.batchGet"}
+# Safe to send again after a 5xx, which may have been applied anyway.
+# values.append and batchUpdate (addSheet) are only retried after a 429,
+# which the API rejects before doing anything.
+IDEMPOTENT_METHODS = READ_METHODS | {"values.update", "values.batchUpdate"}
+
+
+def is_read(method):
+    return method in READ_METHODS
+
+
+class TokenBucket:
+    """
+    Refills per_minute tokens a minute, holding at most burst. A caller
+    that finds the bucket empty reserves the next token and sleeps until
+    it is due, so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute, burst=QUOTA_BURST):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, min(burst, per_minute)) if per_minute else 0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # Caller must hold self._lock
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take a token, sleeping until one is available; return the wait."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def drain(self):
+        """Drop the stored tokens, e.g. after the API reported a 429."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+    def available(self):
+        """Tokens that can be taken right now without waiting."""
+        if not self.rate:
+            return None
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, self._tokens)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QuotaScheduler:
+    """
+    Every Sheets request goes through run(), which
+
+    - takes a token from the read or write bucket, so the process as a
+      whole stays under the per-minute quotas,
+    - merges identical reads that are in flight at the same time into one
+      request whose result every caller shares (and must not modify),
+    - retries 429 and 5xx responses with exponential backoff, honouring
+      Retry-After.
+
+    A read only joins one that started after the last completed write, so
+    a session always sees its own writes.
+    """
+
+    def __init__(
+        self,
+        reads_per_minute=READ_REQUESTS_PER_MINUTE,
+        writes_per_minute=WRITE_REQUESTS_PER_MINUTE,
+        burst=QUOTA_BURST,
+        max_retries=SHEETS_MAX_RETRIES,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+    ):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute, burst),
+            "write": TokenBucket(writes_per_minute, burst),
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._writes_done = 0
+        self.stats = {
+            "requests": 0,
+            "merged_reads": 0,
+            "quota_waits": 0,
+            "quota_wait_s": 0.0,
+            "retries": 0,
+            "rate_limited": 0,
+        }
+        metrics.gauge("sheets_quota_available", self._headroom)
+
+    def _headroom(self):
+        return [({"kind": kind}, b.available()) for kind, b in self.buckets.items() if b.rate]
+
+    def run(self, request, method, send):
+        """Execute request, whose API method is method, with send(request)."""
+        if not is_read(method):
+            try:
+                return self._send(request, send, "write", method)
+            finally:
+                with self._lock:
+                    self._writes_done += 1
+        uri = getattr(request, "uri", None)
+        if uri is None:
+            return self._send(request, send, "read", method)
+        with self._lock:
+            key = (uri, getattr(request, "body", None), self._writes_done)
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.stats["merged_reads"] += 1
+        if not leader:
+            metrics.inc("sheets_merged_reads", method=method)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = self._send(request, send, "read", method)
+            return call.result
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def _send(self, request, send, kind, method):
+        bucket = self.buckets[kind]
+        attempt = 0
+        while True:
+            wait = bucket.acquire()
+            with self._lock:
+                self.stats["requests"] += 1
+                if wait:
+                    self.stats["quota_waits"] += 1
+                    self.stats["quota_wait_s"] += wait
+            if wait:
+                metrics.inc("sheets_quota_waits", kind=kind)
+                metrics.inc("sheets_quota_wait_seconds", wait, kind=kind)
+            try:
+                return send(request)
+            except HttpError as error:
+                status = int(error.resp.status)
+                if status == 429:
+                    # Everyone waits for fresh quota, not just this caller
+                    bucket.drain()
+                    with self._lock:
+                        self.stats["rate_limited"] += 1
+                retryable = status == 429 or (
+                    status >= 500 and method in IDEMPOTENT_METHODS
+                )
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, error)
+                with self._lock:
+                    self.stats["retries"] += 1
+                metrics.inc("sheets_retries", method=method, status=status)
+                time.sleep(delay)
+                attempt += 1
+
+    def _backoff(self, attempt, error):
+        retry_after = error.resp.get("retry-after")
+        if retry_after and str(retry_after).isdigit():
+            return min(float(retry_after), self.backoff_max)
+        delay = min(self.backoff_base * 2**attempt, self.backoff_max)
+        # Jitter keeps sessions that failed together from retrying together
+        return delay * random.uniform(0.5, 1.0)
+
+    def snapshot_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["reads_in_flight"] = len(self._inflight)
+        for kind, bucket in self.buckets.items():
+            stats[f"{kind}_quota_per_minute"] = bucket.per_minute
+            stats[f"{kind}_quota_available"] = bucket.available()
+        return stats
+
@@ -0,0 +1,148 @@
+import math
+import os
+from collections import defaultdict
+
+import numpy as np
+
+import metrics
+from complaint import Status, parse_location
+from complaint_cache import register_derived
+
+
+# Edge length of a grid cell in meters
+GRID_CELL_M = float(os.getenv("GRID_CELL_M", "100"))
+# Latitude the longitude cell width is computed for (Yonsei Sinchon Campus)
+GRID_REF_LAT = 37.5665
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEG_LAT = 111320.0
+OPEN_STATUSES = (Status.PENDING.value, Status.IN_PROGRESS.value)
+
+
+def haversine_m(lat, lng, lats, lngs):
+    """Distance in meters from (lat, lng) to each point of the lats/lngs arrays."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class GridIndex:
+    """
+    Uniform lat/lng grid over complaint coordinates.
+
+    Point ids are the row positions in the snapshot, so ids line up with
+    snapshot.rows. Points without valid coordinates get an id but are not
+    placed in any cell. Radius and box queries only look at the cells that
+    overlap the query area.
+    """
+
+    def __init__(self, cell_m=GRID_CELL_M, ref_lat=GRID_REF_LAT):
+        self.cell_m = cell_m
+        self.dlat = cell_m / METERS_PER_DEG_LAT
+        self.dlng = cell_m / (METERS_PER_DEG_LAT * math.cos(math.radians(ref_lat)))
+        self._cells = defaultdict(list)
+        self.lat = []
+        self.lng = []
+        self.status = []
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.dlat), math.floor(lng / self.dlng)
+
+    @classmethod
+    def from_arrays(cls, lats, lngs, statuses, **kwargs):
+        index = cls(**kwargs)
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        valid = ~(np.isnan(lats) | np.isnan(lngs))
+        rows = np.floor(np.where(valid, lats, 0) / index.dlat).astype(np.int64)
+        cols = np.floor(np.where(valid, lngs, 0) / index.dlng).astype(np.int64)
+        for point_id in np.flatnonzero(valid).tolist():
+            index._cells[(rows[point_id], cols[point_id])].append(point_id)
+        index.lat = lats.tolist()
+        index.lng = lngs.tolist()
+        index.status = [str(s) for s in statuses]
+        return index
+
+    def add(self, lat, lng, status):
+        """Add one point and return its id."""
+        point_id = len(self.lat)
+        self.lat.append(lat)
+        self.lng.append(lng)
+        self.status.append(status)
+        if not (math.isnan(lat) or math.isnan(lng)):
+            self._cells[self._cell(lat, lng)].append(point_id)
+        return point_id
+
+    def set_status(self, point_ids, status):
+        for point_id in point_ids:
+            self.status[point_id] = status
+
+    def _candidates(self, south, west, north, east):
+        r0, c0 = self._cell(south, west)
+        r1, c1 = self._cell(north, east)
+        ids = []
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                ids.extend(self._cells.get((r, c), ()))
+        return ids
+
+    def query_bbox(self, south, west, north, east, statuses=None):
+        """Ids of the points inside the box."""
+        return [
+            i
+            for i in self._candidates(south, west, north, east)
+            if south <= self.lat[i] <= north
+            and west <= self.lng[i] <= east
+            and (statuses is None or self.status[i] in statuses)
+        ]
+
+    def query_radius(self, lat, lng, radius_m, statuses=None):
+        """(id, distance_m) of the points within radius_m, nearest first."""
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlng = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        ids = self._candidates(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+        if statuses is not None:
+            ids = [i for i in ids if self.status[i] in statuses]
+        if not ids:
+            return []
+        distances = haversine_m(
+            lat,
+            lng,
+            np.fromiter((self.lat[i] for i in ids), np.float64, len(ids)),
+            np.fromiter((self.lng[i] for i in ids), np.float64, len(ids)),
+        )
+        order = np.argsort(distances)
+        return [
+            (ids[k], float(distances[k])) for k in order if distances[k] <= radius_m
+        ]
+
+
+@metrics.timed("spatial_build")
+def _build_index(snapshot):
+    # Parsed from the rows directly, without building the typed frame
+    points = [parse_location(row[5]) for row in snapshot.rows]
+    return GridIndex.from_arrays(
+        [lat for lat, _ in points],
+        [lng for _, lng in points],
+        [row[6] for row in snapshot.rows],
+    )
+
+
+def _update_index(index, snapshot, event, change):
+    if event == "append":
+        for row in change[1]:
+            lat, lng = parse_location(row[5])
+            index.add(lat, lng, row[6])
+    else:
+        positions, new_status = change
+        index.set_status(positions, new_status)
+    return index
+
+
+register_derived("spatial", _build_index, _update_index)
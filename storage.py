@@ -0,0 +1,439 @@
+import os
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+import facet_index  # also registers the "facets" snapshot structure
+import utils
+from complaint import COLUMNS, new_complaint_id, normalize_row
+from complaint_cache import Snapshot
+from utils import ChunkResult, chunk_rows
+
+load_dotenv()
+
+
+# "sheets" (default) or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sheets").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "complaints.db")
+
+
+class StorageBackend:
+    """
+    Interface every complaint store implements.
+
+    Rows are lists in COLUMNS order. Dates are "YYYY-MM-DD" strings, so
+    date_from/date_to compare correctly as text.
+    """
+
+    def append(self, row):
+        """Store one row; return True on success."""
+        raise NotImplementedError
+
+    def append_many(self, rows, stop_on_error=False):
+        """
+        Store many rows or Complaint objects; return a list of ChunkResult.
+        With stop_on_error, nothing after the first failed chunk is stored.
+        """
+        raise NotImplementedError
+
+    def fetch(
+        self,
+        author=None,
+        status=None,
+        date_from=None,
+        date_to=None,
+        limit=None,
+        offset=0,
+    ):
+        """Return the matching rows in insertion order, or None on failure."""
+        raise NotImplementedError
+
+    def iter_pages(self, page_rows):
+        """Yield every row in insertion order, in lists of at most page_rows."""
+        offset = 0
+        while True:
+            rows = self.fetch(limit=page_rows, offset=offset)
+            if rows is None:
+                raise RuntimeError(f"Reading rows from offset {offset} failed")
+            if not rows:
+                return
+            yield rows
+            offset += len(rows)
+
+    def fetch_frame(self, author=None, status=None, date_from=None, date_to=None):
+        """Return the matching rows as a typed frame (see load_complaint_frame).
+        The frame may be shared between sessions and must not be modified."""
+        # pandas is only imported by the pages that show frames
+        from complaint_frame import load_complaint_frame
+
+        return load_complaint_frame(self.fetch(author, status, date_from, date_to))
+
+    def snapshot(self, date_from=None, date_to=None):
+        """
+        Return a shared, cached Snapshot holding the rows dated
+        date_from..date_to, or None on failure. It may hold other rows too;
+        without a range it holds all of them.
+        """
+        raise NotImplementedError
+
+    def summary(self):
+        """
+        Return a shared, cached Snapshot with at least the author, date,
+        time, status and ID of every row, enough for facet counts and date
+        bounds, or None on failure. By default the full snapshot.
+        """
+        return self.snapshot()
+
+    def count(self, author=None, status=None, date_from=None, date_to=None):
+        """Return the number of matching rows, or None on failure."""
+        rows = self.fetch(author, status, date_from, date_to)
+        return None if rows is None else len(rows)
+
+    def facet_counts(
+        self, facet, author=None, status=None, date_from=None, date_to=None
+    ):
+        """
+        Return {value: rows} for facet ("author", "status" or "date") among
+        the rows matching the other filters; facet's own filter is ignored.
+        """
+        summary = self.summary()
+        if summary is None:
+            return {}
+        return summary.derived("facets").counts(
+            facet, author, status, date_from, date_to
+        )
+
+    def authors(self):
+        """Return the sorted distinct authors, or None on failure."""
+        raise NotImplementedError
+
+    def update_status(self, ids, new_status):
+        """
+        ids: list of complaint IDs
+        Return the number of rows updated.
+        """
+        raise NotImplementedError
+
+    def stored_ids(self, ids):
+        """
+        Return the subset of ids that are stored, read from the store
+        rather than a cache, or None on failure.
+        """
+        raise NotImplementedError
+
+
+class SheetsBackend(StorageBackend):
+    """Google Sheets store; reads come from the shared snapshot cache."""
+
+    def append(self, row):
+        return utils.save_to_sheet(row) is not None
+
+    def append_many(self, rows, stop_on_error=False):
+        return utils.append_rows(rows, stop_on_error=stop_on_error)
+
+    def fetch(
+        self,
+        author=None,
+        status=None,
+        date_from=None,
+        date_to=None,
+        limit=None,
+        offset=0,
+    ):
+        # With month tabs, a date range may only need some of the tabs
+        snapshot = utils.get_snapshot(date_from, date_to)
+        if snapshot is None:
+            return None
+        end = None if limit is None else offset + limit
+        if not (author or status or date_from or date_to):
+            return snapshot.rows[offset:end]
+        # Matching positions come from the facet index, then are paged
+        positions = snapshot.derived("facets").positions(
+            author, status, date_from, date_to
+        )
+        return [snapshot.rows[i] for i in positions[offset:end].tolist()]
+
+    def iter_pages(self, page_rows):
+        # Ranged reads straight from the sheet, so the whole sheet is never
+        # held in memory; rows keep their legacy IDs
+        tabs = utils.partition_tabs() if utils.SHEET_PARTITIONS else [None]
+        for tab in tabs:
+            for first_row, rows in utils.iter_sheet_pages(page_rows, tab):
+                yield [
+                    normalize_row(row, first_row + offset, tab)
+                    for offset, row in enumerate(rows)
+                ]
+
+    def count(self, author=None, status=None, date_from=None, date_to=None):
+        snapshot = utils.get_snapshot(date_from, date_to)
+        if snapshot is None:
+            return None
+        facets = snapshot.derived("facets")
+        return len(facets.positions(author, status, date_from, date_to))
+
+    def fetch_frame(self, author=None, status=None, date_from=None, date_to=None):
+        # Importing complaint_frame also registers the "frame" structure
+        from complaint_frame import load_complaint_frame
+
+        # Parsed once per snapshot; the facet index picks the matching rows
+        snapshot = utils.get_snapshot(date_from, date_to)
+        if snapshot is None:
+            return load_complaint_frame([])
+        df = snapshot.derived("frame")
+        if not (author or status or date_from or date_to):
+            return df
+        positions = snapshot.derived("facets").positions(
+            author, status, date_from, date_to
+        )
+        return df.iloc[positions]
+
+    def snapshot(self, date_from=None, date_to=None):
+        # With month tabs, a date range may only need some of the tabs
+        return utils.get_snapshot(date_from, date_to)
+
+    def summary(self):
+        return utils.get_summary()
+
+    def authors(self):
+        summary = utils.get_summary()
+        if summary is None:
+            return None
+        return summary.derived("facets").values("author")
+
+    def update_status(self, ids, new_status):
+        return utils.update_status_in_sheet(ids, new_status)
+
+    def stored_ids(self, ids):
+        return utils.stored_ids(ids)
+
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite store with indexes on the filtered columns."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS complaints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            author TEXT,
+            title TEXT,
+            description TEXT,
+            date TEXT,
+            time TEXT,
+            location TEXT,
+            status TEXT,
+            cid TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints (status);
+        CREATE INDEX IF NOT EXISTS idx_complaints_author ON complaints (author);
+        CREATE INDEX IF NOT EXISTS idx_complaints_date ON complaints (date);
+        CREATE INDEX IF NOT EXISTS idx_complaints_location ON complaints (location);
+    """
+    INDEXES = """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_complaints_cid ON complaints (cid);
+    """
+    FIELDS = "author, title, description, date, time, location, status, cid"
+    PLACEHOLDERS = ", ".join("?" * len(COLUMNS))
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        # One connection shared by all sessions, serialised by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+            self._migrate()
+            self._conn.executescript(self.INDEXES)
+
+    def _migrate(self):
+        # Databases created before complaint IDs get the column and new IDs
+        columns = [r[1] for r in self._conn.execute("PRAGMA table_info(complaints)")]
+        if "cid" not in columns:
+            self._conn.execute("ALTER TABLE complaints ADD COLUMN cid TEXT")
+        missing = self._conn.execute(
+            "SELECT id FROM complaints WHERE cid IS NULL OR cid = ''"
+        ).fetchall()
+        if missing:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE complaints SET cid = ? WHERE id = ?",
+                    [(new_complaint_id(), r[0]) for r in missing],
+                )
+
+    @staticmethod
+    def _pad(row):
+        return normalize_row(row)
+
+    def append(self, row):
+        row = self._pad(row)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO complaints ({self.FIELDS}) VALUES ({self.PLACEHOLDERS})",
+                row,
+            )
+        utils.complaint_cache.apply("append", [row])
+        return True
+
+    def append_many(self, rows, stop_on_error=False):
+        results = []
+        for start, chunk in chunk_rows(rows):
+            try:
+                with self._lock, self._conn:
+                    self._conn.executemany(
+                        f"INSERT INTO complaints ({self.FIELDS}) "
+                        f"VALUES ({self.PLACEHOLDERS})",
+                        chunk,
+                    )
+                results.append(ChunkResult(start, chunk, True, len(chunk), None))
+                utils.complaint_cache.apply("append", chunk)
+            except sqlite3.Error as error:
+                results.append(ChunkResult(start, chunk, False, None, error))
+                if stop_on_error:
+                    break
+        return results
+
+    @staticmethod
+    def _where(author, status, date_from, date_to):
+        clauses = []
+        params = []
+        if author is not None:
+            clauses.append("author = ?")
+            params.append(author)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if date_from is not None:
+            clauses.append("date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            clauses.append("date <= ?")
+            params.append(date_to)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def fetch(
+        self,
+        author=None,
+        status=None,
+        date_from=None,
+        date_to=None,
+        limit=None,
+        offset=0,
+    ):
+        where, params = self._where(author, status, date_from, date_to)
+        sql = f"SELECT {self.FIELDS} FROM complaints{where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        elif offset:
+            sql += " LIMIT -1 OFFSET ?"
+            params.append(offset)
+        with self._lock:
+            return [list(r) for r in self._conn.execute(sql, params)]
+
+    def iter_pages(self, page_rows):
+        # Keyset paging on the primary key stays fast at any depth
+        last_id = 0
+        while True:
+            with self._lock:
+                page = self._conn.execute(
+                    f"SELECT id, {self.FIELDS} FROM complaints "
+                    "WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_rows),
+                ).fetchall()
+            if not page:
+                return
+            last_id = page[-1][0]
+            yield [list(r[1:]) for r in page]
+
+    def count(self, author=None, status=None, date_from=None, date_to=None):
+        where, params = self._where(author, status, date_from, date_to)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM complaints{where}", params
+            ).fetchone()[0]
+
+    def facet_counts(
+        self, facet, author=None, status=None, date_from=None, date_to=None
+    ):
+        if facet not in facet_index.FACETS:
+            raise ValueError(
+                f"Invalid facet: {facet}. Valid facets are: {list(facet_index.FACETS)}"
+            )
+        if facet == "author":
+            author = None
+        elif facet == "status":
+            status = None
+        else:
+            date_from = date_to = None
+        where, params = self._where(author, status, date_from, date_to)
+        # Columns are named after the facets; each is indexed
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {facet}, COUNT(*) FROM complaints{where} GROUP BY {facet}",
+                params,
+            ).fetchall()
+        return dict(rows)
+
+    def authors(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT author FROM complaints "
+                "WHERE author IS NOT NULL AND author != '' ORDER BY author"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def snapshot(self, date_from=None, date_to=None):
+        return utils.complaint_cache.get(
+            f"sqlite:{self.path}", lambda: Snapshot(self.fetch())
+        )
+
+    def update_status(self, ids, new_status):
+        ids = list(ids)
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                "UPDATE complaints SET status = ? WHERE cid = ?",
+                [(new_status, cid) for cid in ids],
+            )
+            updated = cur.rowcount
+        utils.complaint_cache.apply("status", (ids, new_status))
+        return updated
+
+    def stored_ids(self, ids):
+        ids = list(ids)
+        found = set()
+        with self._lock:
+            # Well under SQLite's limit of host parameters per statement
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                found.update(
+                    r[0]
+                    for r in self._conn.execute(
+                        "SELECT cid FROM complaints "
+                        f"WHERE cid IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return found
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend selected by STORAGE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if STORAGE_BACKEND == "sqlite":
+                    _backend = SQLiteBackend()
+                elif STORAGE_BACKEND == "sheets":
+                    _backend = SheetsBackend()
+                else:
+                    raise ValueError(
+                        f"Invalid STORAGE_BACKEND: {STORAGE_BACKEND}. "
+                        "Valid backends are: ['sheets', 'sqlite']"
+                    )
+    return _backend
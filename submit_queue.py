@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+from tenacity import (
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+import metrics
+from complaint import ID_COLUMN, normalize_row
+
+load_dotenv()
+
+
+SUBMIT_QUEUE_PATH = os.getenv("SUBMIT_QUEUE_PATH", "submit_queue.db")
+# Largest number of queued complaints sent in one batched append
+SUBMIT_BATCH_SIZE = int(os.getenv("SUBMIT_BATCH_SIZE", "200"))
+# Seconds the worker waits after a wake-up so close submissions coalesce
+SUBMIT_LINGER = float(os.getenv("SUBMIT_LINGER", "0.5"))
+# Seconds to pause after a batch exhausted its retries
+SUBMIT_IDLE_RETRY = float(os.getenv("SUBMIT_IDLE_RETRY", "30"))
+
+
+class FlushError(Exception):
+    pass
+
+
+class SubmitQueue:
+    """
+    Durable write-behind queue for new complaints.
+
+    enqueue() only writes the row to a local SQLite file and returns. A
+    daemon worker drains the file in batches through backend.append_many,
+    retrying with exponential backoff. Rows are deleted only once their
+    chunk is confirmed, so nothing is lost if the process stops.
+
+    A failed append may still have stored its rows (e.g. after a 5xx), so
+    rows that were sent before are looked up by ID in the store and only
+    sent again if they are not there. Rows get their ID when enqueued.
+    """
+
+    def __init__(self, backend, path=SUBMIT_QUEUE_PATH):
+        self.backend = backend
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pending (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    row TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+        self.sent = 0
+        self.failed_attempts = 0
+        self.last_error = None
+
+    def start(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="submit-queue", daemon=True
+            )
+            self._worker.start()
+        # Rows left over from a previous run are sent straight away
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def enqueue(self, row):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pending (row, enqueued_at) VALUES (?, ?)",
+                (json.dumps(normalize_row(row)), time.time()),
+            )
+        self._wake.set()
+
+    def status(self):
+        with self._lock:
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM pending"
+            ).fetchone()
+        return {
+            "depth": depth,
+            "oldest_age": time.time() - oldest if oldest is not None else 0.0,
+            "sent": self.sent,
+            "failed_attempts": self.failed_attempts,
+            "last_error": self.last_error,
+        }
+
+    def _next_batch(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, row FROM pending ORDER BY id LIMIT ?",
+                (SUBMIT_BATCH_SIZE,),
+            ).fetchall()
+
+    def _unsent(self, ids):
+        """
+        The rows of ids still pending, minus those a previous attempt
+        stored after all; those are deleted from the queue.
+        """
+        with self._lock:
+            pending = self._conn.execute(
+                f"SELECT id, row, attempts FROM pending "
+                f"WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id",
+                ids,
+            ).fetchall()
+        batch = [(item_id, row) for item_id, row, _ in pending]
+        tried = {
+            json.loads(row)[ID_COLUMN]: item_id
+            for item_id, row, attempts in pending
+            if attempts
+        }
+        if not tried:
+            return batch
+        stored = self.backend.stored_ids(list(tried))
+        if stored is None:
+            # Sending blind could store the same complaint twice
+            raise FlushError("Could not check which complaints were stored")
+        done = {tried[cid] for cid in stored}
+        if done:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "DELETE FROM pending WHERE id = ?", [(i,) for i in done]
+                )
+            self.sent += len(done)
+            metrics.inc("submit_rows_sent", len(done))
+        return [(item_id, row) for item_id, row in batch if item_id not in done]
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        ids = [item_id for item_id, _ in batch]
+        rows = [json.loads(row) for _, row in batch]
+        with metrics.span("submit_flush"):
+            results = self.backend.append_many(rows)
+        done = [
+            ids[r.start + offset]
+            for r in results
+            if r.ok
+            for offset in range(len(r.rows))
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM pending WHERE id = ?", [(i,) for i in done]
+            )
+            self._conn.execute(
+                f"UPDATE pending SET attempts = attempts + 1 "
+                f"WHERE id IN ({','.join('?' * len(ids))})",
+                ids,
+            )
+        self.sent += len(done)
+        metrics.inc("submit_rows_sent", len(done))
+        errors = [r.error for r in results if not r.ok]
+        if errors:
+            self.failed_attempts += 1
+            metrics.inc("submit_errors")
+            self.last_error = str(errors[0])
+            raise FlushError(self.last_error)
+
+    def _drain(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if not batch:
+                return True
+            ids = [item_id for item_id, _ in batch]
+            try:
+                for attempt in Retrying(
+                    retry=retry_if_exception_type(Exception),
+                    wait=wait_exponential(multiplier=1, min=1, max=30),
+                    stop=stop_after_attempt(5),
+                    reraise=True,
+                ):
+                    with attempt:
+                        # A retry only resends the rows still unsent
+                        self._flush(self._unsent(ids))
+            except Exception as error:
+                self.last_error = str(error)
+                return False
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            time.sleep(SUBMIT_LINGER)
+            if not self._drain():
+                # Leave the rows queued and try again later
+                self._stopped.wait(SUBMIT_IDLE_RETRY)
+                self._wake.set()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(backend):
+    """Return the process-wide submission queue, starting its worker."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SubmitQueue(backend)
+                _queue.start()
+    return _queue
@@ -0,0 +1,41 @@
+import os
+import random
+import sys
+
+import pytest
+
+# The app's modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: E402
+from fake_sheets import FakeSheets, FakeSheetsClient  # noqa: E402
+
+
+def make_rows(count, seed=0, start=0):
+    """count random complaint rows with IDs, the same for the same seed."""
+    random.seed(seed)
+    return [
+        utils.random_test_row(i) + [f"id{i}"] for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    """A FakeSheets installed as the app's Sheets client, with one tab."""
+    monkeypatch.setattr(utils, "PARQUET_SNAPSHOT_DIR", None)
+    monkeypatch.setattr(utils, "SHEET_PARTITIONS", False)
+    fake = FakeSheets()
+    utils.set_client(FakeSheetsClient(fake))
+    yield fake
+    utils.complaint_cache.invalidate()
+
+
+@pytest.fixture
+def month_sheets(sheets, monkeypatch):
+    """sheets with monthly partitioning on and tabs for 2025-05 and 2025-06."""
+    monkeypatch.setattr(utils, "SHEET_PARTITIONS", True)
+    header = sheets.tabs[next(iter(sheets.tabs))][0]
+    for month in ("2025-05", "2025-06"):
+        sheets.tabs[f"{utils.PARTITION_PREFIX} {month}"] = [list(header)]
+    utils.set_client(FakeSheetsClient(sheets))
+    return sheets
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+import api_server
+import utils
+from complaint import parse_location
+from storage import SheetsBackend
+
+from conftest import make_rows
+
+
+@pytest.fixture
+def api(sheets):
+    """get(path, **headers): a response from the API over the sheets fixture."""
+    app = api_server.make_app(SheetsBackend())
+
+    async def fetch(path, headers):
+        sock, port = bind_unused_port()
+        server = HTTPServer(app)
+        server.add_sockets([sock])
+        try:
+            return await AsyncHTTPClient().fetch(
+                f"http://127.0.0.1:{port}{path}", headers=headers, raise_error=False
+            )
+        finally:
+            server.stop()
+
+    def get(path, **headers):
+        return asyncio.run(fetch(path, headers))
+
+    return get
+
+
+def test_bbox_returns_the_rows_inside_it(sheets, api):
+    rows = make_rows(40)
+    sheets.load_rows(rows)
+    response = api("/complaints?bbox=126.93,37.56,126.9375,37.5675&limit=1000")
+    assert response.code == 200
+    expected = []
+    for row in rows:
+        lat, lng = parse_location(row[5])
+        if 126.93 <= lng <= 126.9375 and 37.56 <= lat <= 37.5675:
+            expected.append(row[7])
+    assert 0 < len(expected) < len(rows)
+    body = json.loads(response.body)
+    assert [item["id"] for item in body["items"]] == expected
+    assert body["total"] == len(expected)
+
+
+def test_bbox_must_have_four_numbers(sheets, api):
+    assert api("/complaints?bbox=1,2,3").code == 400
+
+
+def _pages(api, query, limit):
+    ids = []
+    cursor = ""
+    while True:
+        response = api(f"/complaints?limit={limit}{query}{cursor}")
+        assert response.code == 200
+        body = json.loads(response.body)
+        ids += [item["id"] for item in body["items"]]
+        if body["next_cursor"] is None:
+            return ids
+        cursor = f"&cursor={body['next_cursor']}"
+
+
+def test_etag_answers_304_until_the_data_changes(sheets, api):
+    sheets.load_rows(make_rows(10))
+    first = api("/complaints")
+    etag = first.headers["ETag"]
+    assert api("/complaints", **{"If-None-Match": etag}).code == 304
+    # A reload of the same rows keeps the tag
+    utils.complaint_cache.invalidate()
+    assert api("/complaints", **{"If-None-Match": etag}).code == 304
+    assert api("/complaints/id3", **{"If-None-Match": etag}).code == 304
+
+    assert utils.update_status_in_sheet(["id3"], "Pending") == 1
+    changed = api("/complaints", **{"If-None-Match": etag})
+    assert changed.code == 200
+    assert changed.headers["ETag"] != etag
+    etag = changed.headers["ETag"]
+    utils.save_to_sheet(make_rows(1, start=10)[0])
+    assert api("/complaints", **{"If-None-Match": etag}).code == 200
+
+
+def test_cursor_pages_through_every_row_once(sheets, api):
+    rows = make_rows(23)
+    sheets.load_rows(rows)
+    assert _pages(api, "", 5) == [row[7] for row in rows]
+    expected = [row[7] for row in rows if row[6] == "Pending"]
+    assert _pages(api, "&status=Pending", 2) == expected
+
+
+def test_cursor_survives_a_reload_of_month_tabs(month_sheets, api):
+    may = f"{utils.PARTITION_PREFIX} 2025-05"
+    june = f"{utils.PARTITION_PREFIX} 2025-06"
+    rows = make_rows(12)
+    for row in rows[:6]:
+        row[3] = "2025-05-20"
+    month_sheets.load_rows(rows[:6], may)
+    month_sheets.load_rows(rows[6:], june)
+    body = json.loads(api("/complaints?limit=4").body)
+    seen = [item["id"] for item in body["items"]]
+    # A row appended to May is merged before June's rows after the reload
+    added = make_rows(1, start=12)[0]
+    added[3] = "2025-05-21"
+    assert utils.save_to_sheet(added) is not None
+    utils.complaint_cache.invalidate()
+    cursor = body["next_cursor"]
+    seen += _pages(api, f"&cursor={cursor}", 4)
+    assert len(seen) == len(set(seen))
+    assert seen == [row[7] for row in rows[:6]] + ["id12"] + [
+        row[7] for row in rows[6:]
+    ]
+
+
+def test_bad_cursors_and_unknown_ids(sheets, api):
+    sheets.load_rows(make_rows(3))
+    assert api("/complaints?cursor=not-a-cursor").code == 400
+    assert api("/complaints/nope").code == 404
+    assert json.loads(api("/complaints/id1").body)["id"] == "id1"
@@ -0,0 +1,25 @@
+from complaint import ComplaintBatch
+
+from conftest import make_rows
+
+
+def test_batch_rows_round_trip():
+    rows = make_rows(3)
+    rows[1][2] = "x" * 5000
+    assert ComplaintBatch.from_rows(rows).to_rows() == rows
+
+
+def test_batch_rows_write_none_as_empty():
+    rows = make_rows(2)
+    rows[0][4] = None
+    assert ComplaintBatch.from_rows(rows).to_rows()[0][4] == ""
+
+
+def test_batch_masks():
+    rows = make_rows(4)
+    rows[1][0] = None
+    rows[2][6] = "Unknown"
+    rows[3][6] = None
+    batch = ComplaintBatch.from_rows(rows)
+    assert batch.valid_mask().tolist() == [True, False, True, True]
+    assert batch.status_mask().tolist() == [True, True, False, False]
@@ -0,0 +1,81 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+import density
+from complaint_frame import load_complaint_frame
+from map_render import density_cells
+
+from conftest import make_rows
+
+
+def _inside(point, corners):
+    """True if point (lat, lng) is inside or on the convex polygon corners."""
+    signs = set()
+    for (y1, x1), (y2, x2) in zip(corners, corners[1:] + corners[:1]):
+        cross = (x2 - x1) * (point[0] - y1) - (y2 - y1) * (point[1] - x1)
+        if abs(cross) > 1e-15:
+            signs.add(cross > 0)
+    return len(signs) <= 1
+
+
+@pytest.mark.parametrize("grid", ["hex", "square"])
+def test_every_point_lies_in_its_cell(grid):
+    random.seed(0)
+    for _ in range(200):
+        lat = random.uniform(37.56, 37.57)
+        lng = random.uniform(126.93, 126.945)
+        polygons, counts = density.bin_points([lat], [lng], [0], 1, 75, grid=grid)
+        assert counts.tolist() == [[1]]
+        assert _inside((lat, lng), polygons[0])
+
+
+@pytest.mark.parametrize("grid", ["hex", "square"])
+def test_counts_per_cell_and_status(grid):
+    random.seed(1)
+    lats = [random.uniform(37.56, 37.57) for _ in range(500)] + [math.nan, 37.565]
+    lngs = [random.uniform(126.93, 126.945) for _ in range(500)] + [126.94, math.nan]
+    codes = [random.randrange(3) for _ in range(500)] + [0, 0]
+    codes[0] = -1  # e.g. a status outside the categories
+    polygons, counts = density.bin_points(lats, lngs, codes, 3, 200, grid=grid)
+    assert len(polygons) == len(counts)
+    assert counts.sum() == 499
+    assert counts.sum(axis=0).tolist() == np.bincount(codes[1:500], minlength=3).tolist()
+    # Far fewer cells than points at this size, and none empty
+    assert len(polygons) < 100 and (counts.sum(axis=1) > 0).all()
+
+
+def test_unknown_grid():
+    with pytest.raises(ValueError):
+        density.bin_points([37.5], [126.9], [0], 1, 100, grid="triangle")
+
+
+def test_no_points():
+    polygons, counts = density.bin_points([math.nan], [126.9], [0], 2, 100)
+    assert polygons == [] and counts.shape == (0, 2)
+
+
+def test_cell_size_halves_with_each_zoom_level():
+    assert density.cell_size_m(15) == pytest.approx(2 * density.cell_size_m(16))
+    assert density.cell_size_m(0, lat=0, cell_px=1) == pytest.approx(
+        density.METERS_PER_PIXEL_Z0
+    )
+
+
+def test_density_cells_grow_with_cells_not_complaints():
+    small = density_cells(load_complaint_frame(make_rows(50)), 500)
+    large = density_cells(load_complaint_frame(make_rows(2000, seed=1)), 500)
+    # The test rows cover about 1.1 by 1.3 km, at most 20 cells this size
+    assert len(small["features"]) <= len(large["features"]) <= 20
+    assert sum(f["properties"]["Total"] for f in large["features"]) == 2000
+    for cells in (small, large):
+        for feature in cells["features"]:
+            properties = feature["properties"]
+            statuses = sum(
+                n for k, n in properties.items() if k not in ("Total", "color")
+            )
+            assert statuses == properties["Total"]
+            ring = feature["geometry"]["coordinates"][0]
+            assert ring[0] == ring[-1]
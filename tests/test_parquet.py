@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+import utils
+from parquet_snapshot import ParquetSnapshot
+
+from conftest import make_rows
+
+
+@pytest.fixture
+def store_dir(sheets, tmp_path, monkeypatch):
+    """The sheets fixture with a Parquet snapshot directory in tmp_path."""
+    path = str(tmp_path / "snapshot")
+    monkeypatch.setattr(utils, "PARQUET_SNAPSHOT_DIR", path)
+    return path
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """The method of every request sent to the fake from now on."""
+    methods = []
+    client = utils.get_client()
+    send = client._send
+
+    def record(request):
+        methods.append(request.methodId.rsplit(".", 2)[-1])
+        return send(request)
+
+    monkeypatch.setattr(client, "_send", record)
+    return methods
+
+
+def _store(path):
+    return ParquetSnapshot(path, f"{utils.SPREADSHEET_ID}/{utils.sheet_title()}")
+
+
+def _reload():
+    utils.complaint_cache.invalidate()
+    return utils.get_snapshot()
+
+
+def test_warm_start_reads_only_the_keys_and_tail(sheets, store_dir, sent):
+    rows = make_rows(20)
+    sheets.load_rows(rows)
+    assert utils.get_snapshot().rows == rows
+    assert "get" in sent
+    version = _store(store_dir).version
+
+    del sent[:]
+    assert _reload().rows == rows
+    assert sent == ["batchGet"]
+    # Nothing changed, so nothing was written
+    assert _store(store_dir).version == version
+
+
+def test_new_sheet_rows_are_stored_as_a_new_part(sheets, store_dir):
+    rows = make_rows(10)
+    sheets.load_rows(rows)
+    utils.get_snapshot()
+    added = make_rows(4, seed=1, start=10)
+    sheets.load_rows(added)
+    assert _reload().rows == rows + added
+    assert len([f for f in os.listdir(store_dir) if f.startswith("part-")]) == 2
+    assert _store(store_dir).load() == rows + added
+
+
+def test_status_changes_in_the_sheet_are_reconciled(sheets, store_dir):
+    rows = make_rows(10)
+    sheets.load_rows(rows)
+    utils.get_snapshot()
+    # Changed by another process, not through this one's cache
+    sheets.tabs["Sheet1"][4][6] = "Reopened"
+    snapshot = _reload()
+    assert snapshot.rows[3][6] == "Reopened"
+    assert _store(store_dir).load()[3][6] == "Reopened"
+
+
+def test_moved_rows_rebuild_the_snapshot(sheets, store_dir, sent):
+    rows = make_rows(10)
+    sheets.load_rows(rows)
+    utils.get_snapshot()
+    del sheets.tabs["Sheet1"][3]
+    del sent[:]
+    expected = rows[:2] + rows[3:]
+    assert _reload().rows == expected
+    assert sent == ["batchGet", "get"]
+    assert _store(store_dir).load() == expected
+
+
+def test_the_local_copy_is_served_while_the_sheet_is_unreadable(
+    sheets, store_dir, monkeypatch
+):
+    rows = make_rows(10)
+    sheets.load_rows(rows)
+    utils.get_snapshot()
+    monkeypatch.setattr(utils, "_read_keys_and_tail", lambda last_row: None)
+    assert _reload().rows == rows
+
+
+def test_a_snapshot_of_another_sheet_is_ignored(tmp_path):
+    path = str(tmp_path / "snapshot")
+    ParquetSnapshot(path, "sheet-a").replace(make_rows(3))
+    assert len(ParquetSnapshot(path, "sheet-a").load()) == 3
+    assert ParquetSnapshot(path, "sheet-b").load() is None
+
+
+def test_parts_are_merged_past_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr("parquet_snapshot.PARQUET_MAX_PARTS", 3)
+    store = ParquetSnapshot(str(tmp_path / "snapshot"), "sheet")
+    rows = make_rows(8)
+    store.replace(rows[:2])
+    for start in range(2, 8, 2):
+        store.append(rows[start : start + 2], start + 2)
+    assert len(store._parts()) <= 3
+    assert store.load() == rows
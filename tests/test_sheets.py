@@ -0,0 +1,274 @@
+import json
+import threading
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import bulk
+import fake_sheets
+import utils
+from complaint import COLUMNS
+from fake_sheets import FakeSheets, FakeSheetsClient
+from sheets_scheduler import QuotaScheduler
+from storage import SheetsBackend
+
+from conftest import make_rows
+
+
+def _error(status, retry_after=None):
+    headers = {"status": status}
+    if retry_after is not None:
+        headers["retry-after"] = retry_after
+    return HttpError(httplib2.Response(headers), b"error")
+
+
+def _failing(errors, result="ok"):
+    """A send() raising the given errors in turn, then returning result."""
+    calls = []
+
+    def send(request):
+        calls.append(request)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return send, calls
+
+
+# --- QuotaScheduler ----------------------------------------------------------
+
+
+def test_concurrent_identical_reads_are_merged(sheets):
+    sheets.latency = 0.2
+    sheets.load_rows(make_rows(10))
+    utils.set_client(FakeSheetsClient(sheets, QuotaScheduler(reads_per_minute=6000)))
+    utils.sheet_title()
+    calls = sheets.calls
+    start = threading.Barrier(8)
+    results = []
+
+    def read():
+        start.wait()
+        results.append(utils.get_data_from_sheet())
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sheets.calls == calls + 1
+    assert len(results) == 8 and all(len(rows) == 10 for rows in results)
+
+
+def test_reads_after_a_write_are_not_merged_with_older_ones(sheets):
+    sheets.load_rows(make_rows(3))
+    utils.set_client(FakeSheetsClient(sheets, QuotaScheduler(reads_per_minute=6000)))
+    assert len(utils.get_data_from_sheet()) == 3
+    utils.save_to_sheet(make_rows(1, start=3)[0])
+    assert len(utils.get_data_from_sheet()) == 4
+
+
+def test_rate_limited_requests_are_retried():
+    scheduler = QuotaScheduler(reads_per_minute=6000, backoff_base=0.001)
+    send, calls = _failing([_error(429, "0"), _error(429)])
+    assert scheduler.run(object(), "values.get", send) == "ok"
+    assert len(calls) == 3
+    stats = scheduler.snapshot_stats()
+    assert stats["retries"] == 2
+    assert stats["rate_limited"] == 2
+
+
+def test_server_errors_retry_only_idempotent_requests():
+    scheduler = QuotaScheduler(writes_per_minute=6000, backoff_base=0.001)
+    send, calls = _failing([_error(503)])
+    assert scheduler.run(object(), "values.update", send) == "ok"
+    assert len(calls) == 2
+
+    # The append may have been applied; sending it again could duplicate rows
+    send, calls = _failing([_error(503)])
+    with pytest.raises(HttpError):
+        scheduler.run(object(), "values.append", send)
+    assert len(calls) == 1
+
+    # A 429 is rejected before anything is written, so appends retry it
+    send, calls = _failing([_error(429, "0")])
+    assert scheduler.run(object(), "values.append", send) == "ok"
+
+
+def test_retries_give_up_after_max_retries():
+    scheduler = QuotaScheduler(max_retries=2, backoff_base=0.001)
+    send, calls = _failing([_error(429, "0")] * 5)
+    with pytest.raises(HttpError):
+        scheduler.run(object(), "values.get", send)
+    assert len(calls) == 3
+
+
+# --- chunk_rows --------------------------------------------------------------
+
+
+def test_chunk_rows_splits_on_row_count():
+    rows = make_rows(7)
+    chunks = list(utils.chunk_rows(rows, max_rows=3))
+    assert [(start, len(chunk)) for start, chunk in chunks] == [(0, 3), (3, 3), (6, 1)]
+    assert [row for _, chunk in chunks for row in chunk] == rows
+
+
+def test_chunk_rows_splits_on_size():
+    rows = make_rows(4)
+    for row in rows:
+        # Equal sizes: only the row numbers in title, description and ID differ
+        row[0], row[4], row[5], row[6] = "A", "12:00:00", "[37.5, 126.9]", "Pending"
+    size = len(json.dumps(rows[0]).encode("utf-8")) + 1
+    # Room for exactly two rows of this size
+    chunks = list(utils.chunk_rows(rows, max_rows=100, max_bytes=2 * size + 2))
+    assert [len(chunk) for _, chunk in chunks] == [2, 2]
+    # A single row over the limit still goes out, alone
+    chunks = list(utils.chunk_rows(rows, max_rows=100, max_bytes=1))
+    assert [len(chunk) for _, chunk in chunks] == [1, 1, 1, 1]
+
+
+def test_chunk_rows_splits_where_the_key_changes():
+    rows = make_rows(5)
+    for row, day in zip(rows, ["05-01", "05-02", "06-01", "05-03", "05-04"]):
+        row[3] = f"2025-{day}"
+    chunks = list(utils.chunk_rows(rows, key=lambda row: row[3][:7]))
+    assert [(start, len(chunk)) for start, chunk in chunks] == [(0, 2), (2, 1), (3, 2)]
+
+
+def test_chunk_rows_of_nothing():
+    assert list(utils.chunk_rows([])) == []
+
+
+# --- paged reads -------------------------------------------------------------
+
+
+@pytest.mark.parametrize("count", [0, 1, 4, 5, 11])
+def test_pages_stay_inside_the_grid(monkeypatch, count):
+    monkeypatch.setattr(utils, "PARQUET_SNAPSHOT_DIR", None)
+    # The grid ends on the last row, as after appending to a full sheet
+    sheets = FakeSheets(grid_rows=0)
+    sheets.load_rows(make_rows(count))
+    utils.set_client(FakeSheetsClient(sheets))
+    pages = list(utils.iter_sheet_pages(5))
+    assert [first for first, _ in pages] == list(range(2, count + 2, 5))
+    assert [row for _, rows in pages for row in rows] == sheets.tabs["Sheet1"][1:]
+
+
+def test_tail_read_stays_inside_the_grid(monkeypatch):
+    sheets = FakeSheets(grid_rows=0)
+    sheets.load_rows(make_rows(4))
+    utils.set_client(FakeSheetsClient(sheets))
+    keys, tail = utils._read_keys_and_tail(5)
+    assert len(keys) == 4 and tail == []
+    sheets.load_rows(make_rows(2, start=4))
+    keys, tail = utils._read_keys_and_tail(5)
+    assert [row[7] for row in tail] == ["id4", "id5"]
+
+
+# --- bulk import -------------------------------------------------------------
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        bulk.csv.writer(f).writerows([COLUMNS] + rows)
+
+
+def test_bulk_import_resumes_from_its_checkpoint(sheets, tmp_path, monkeypatch):
+    rows = make_rows(50)
+    rows[3][2] = ""  # skipped: empty description
+    rows[20][6] = "Unknown"  # skipped: invalid status
+    rows[30][0] = ""  # skipped: no author
+    path = str(tmp_path / "in.csv")
+    _write_csv(path, rows)
+    checkpoint = f"{path}.checkpoint.json"
+
+    client = utils.get_client()
+    send = client._send
+    appends = []
+
+    def flaky(request):
+        if request.methodId.endswith("values.append"):
+            appends.append(request)
+            if len(appends) == 3:
+                raise _error(400)
+        return send(request)
+
+    monkeypatch.setattr(client, "_send", flaky)
+    backend = SheetsBackend()
+    with pytest.raises(RuntimeError, match="resume"):
+        bulk.import_file(path, batch_rows=15, backend=backend)
+    # Two batches of 14 valid rows stored; the third batch failed, and its
+    # first valid row is rows[31]
+    assert len(sheets.tabs["Sheet1"]) == 1 + 28
+    with open(checkpoint) as f:
+        assert json.load(f)["rows_done"] == 31
+
+    assert bulk.import_file(path, batch_rows=15, backend=backend) == 19
+    stored = [row[7] for row in sheets.tabs["Sheet1"][1:]]
+    expected = [row[7] for i, row in enumerate(rows) if i not in (3, 20, 30)]
+    assert stored == expected
+    assert not (tmp_path / "in.csv.checkpoint.json").exists()
+
+
+def test_bulk_checkpoint_of_a_changed_file_is_ignored(tmp_path):
+    path = str(tmp_path / "in.csv")
+    _write_csv(path, make_rows(3))
+    checkpoint = str(tmp_path / "state.json")
+    bulk.save_checkpoint(checkpoint, path, 2)
+    assert bulk.load_checkpoint(checkpoint, path) == 2
+    _write_csv(path, make_rows(4))
+    assert bulk.load_checkpoint(checkpoint, path) == 0
+
+
+# --- status updates ----------------------------------------------------------
+
+
+@pytest.fixture
+def status_writes(monkeypatch):
+    """The data of every values.batchUpdate sent, in order."""
+    writes = []
+    batch_update = fake_sheets._FakeValues.batchUpdate
+
+    def spy(self, spreadsheetId=None, body=None):
+        writes.append(body["data"])
+        return batch_update(self, spreadsheetId, body)
+
+    monkeypatch.setattr(fake_sheets._FakeValues, "batchUpdate", spy)
+    return writes
+
+
+def test_status_update_writes_only_the_selected_cells(sheets, status_writes):
+    sheets.load_rows(make_rows(20))
+    before = [list(row) for row in sheets.tabs["Sheet1"]]
+    assert utils.update_status_in_sheet(["id2", "id11", "id17"], "Resolved") == 3
+    (data,) = status_writes
+    assert data == [
+        {"range": "'Sheet1'!G4", "values": [["Resolved"]]},
+        {"range": "'Sheet1'!G13", "values": [["Resolved"]]},
+        {"range": "'Sheet1'!G19", "values": [["Resolved"]]},
+    ]
+    for number, (old, new) in enumerate(zip(before, sheets.tabs["Sheet1"]), 1):
+        if number in (4, 13, 19):
+            old[6] = "Resolved"
+        assert new == old
+
+
+def test_status_update_keeps_rows_appended_meanwhile(sheets, status_writes):
+    sheets.load_rows(make_rows(5))
+    utils.get_snapshot()
+    # Another process appends after the snapshot was taken
+    others = make_rows(3, seed=1, start=5)
+    sheets.load_rows(others)
+    assert utils.update_status_in_sheet(["id1"], "Closed") == 1
+    assert sheets.tabs["Sheet1"][-3:] == others
+    assert sheets.tabs["Sheet1"][2][6] == "Closed"
+
+
+def test_status_update_finds_ids_the_snapshot_has_not_seen(sheets, status_writes):
+    sheets.load_rows(make_rows(5))
+    utils.get_snapshot()
+    sheets.load_rows(make_rows(3, seed=1, start=5))
+    assert utils.update_status_in_sheet(["id1", "id6"], "Closed") == 2
+    assert [d["range"] for d in status_writes[0]] == ["'Sheet1'!G3", "'Sheet1'!G8"]
+    assert utils.update_status_in_sheet(["unknown"], "Closed") == 0
@@ -0,0 +1,174 @@
+import aggregates
+import facet_index
+import utils
+from complaint_cache import Snapshot
+from storage import SheetsBackend
+
+from conftest import make_rows
+
+
+FILTERS = [
+    {},
+    {"author": "Author1"},
+    {"status": "Closed"},
+    {"author": "Author2", "status": "Pending"},
+    {"date_from": "2025-06-02", "date_to": "2025-06-02"},
+    {"date_from": "2025-06-02", "date_to": "2025-06-04", "status": "Resolved"},
+    {"date_from": "2025-06-04"},
+    {"author": "Nobody"},
+]
+
+
+def _written_snapshot():
+    """A snapshot with every derived structure built, then written to."""
+    snapshot = Snapshot(make_rows(300))
+    snapshot.derived("facets")
+    snapshot.derived("cube")
+    added = make_rows(20, seed=1, start=300)
+    added[0][0] = "Newcomer"
+    added[1][3] = "2025-07-01"
+    assert snapshot.apply("append", added)
+    ids = [snapshot.rows[p][7] for p in (0, 7, 305, 310)]
+    assert snapshot.apply("status", (ids, "Closed"))
+    assert snapshot.apply("status", (ids[:1], "Reopened"))
+    return snapshot
+
+
+def test_facet_index_updates_match_rebuild():
+    snapshot = _written_snapshot()
+    updated = snapshot.derived("facets")
+    rebuilt = facet_index.FacetIndex(snapshot.rows)
+    for filters in FILTERS + [{"author": "Newcomer"}, {"status": "Reopened"}]:
+        assert updated.positions(**filters).tolist() == (
+            rebuilt.positions(**filters).tolist()
+        ), filters
+    for facet in ("author", "status", "date"):
+        assert updated.values(facet) == rebuilt.values(facet)
+        assert updated.counts(facet) == rebuilt.counts(facet)
+        assert updated.counts(facet, author="Author1") == (
+            rebuilt.counts(facet, author="Author1")
+        )
+
+
+def test_facet_index_matches_a_scan():
+    snapshot = _written_snapshot()
+    index = snapshot.derived("facets")
+    for filters in FILTERS:
+        expected = [
+            p
+            for p, row in enumerate(snapshot.rows)
+            if filters.get("author", row[0]) == row[0]
+            and filters.get("status", row[6]) == row[6]
+            and filters.get("date_from", row[3]) <= row[3]
+            and row[3] <= filters.get("date_to", row[3])
+        ]
+        assert index.positions(**filters).tolist() == expected, filters
+
+
+def test_cube_updates_match_rebuild():
+    snapshot = _written_snapshot()
+    updated = snapshot.derived("cube")
+    rebuilt = aggregates._build_cube(snapshot)
+    for filters in FILTERS + [{"status": "Reopened"}]:
+        assert updated.total(**filters) == rebuilt.total(**filters), filters
+        assert updated.hourly(**filters)[0] == rebuilt.hourly(**filters)[0], filters
+    assert updated.date_bounds() == rebuilt.date_bounds()
+    assert updated.date_bounds(status="Closed") == rebuilt.date_bounds(status="Closed")
+    assert updated.total() == len(snapshot.rows)
+
+
+def test_apply_append_checks_the_first_row():
+    snapshot = Snapshot(make_rows(5))
+    rows = snapshot.rows
+    # Someone else appended: the write lands after row 8, not row 6
+    assert not snapshot.apply("append", make_rows(1, start=5), first_row=9)
+    assert snapshot.apply("append", make_rows(2, start=5), first_row=7)
+    assert len(snapshot.rows) == 7
+    # Writes replace rows, so an older list stays as it was
+    assert len(rows) == 5
+
+
+def test_apply_status_folds_into_rows_and_ids():
+    snapshot = Snapshot(make_rows(5))
+    version = snapshot.version
+    assert snapshot.apply("status", (["id1", "id3", "unknown"], "Resolved"))
+    assert [row[6] for row in snapshot.rows][1::2] == ["Resolved", "Resolved"]
+    assert snapshot.positions(["id3", "unknown"]) == [3]
+    assert snapshot.version != version
+
+
+def test_apply_in_month_tabs():
+    may = f"{utils.PARTITION_PREFIX} 2025-05"
+    june = f"{utils.PARTITION_PREFIX} 2025-06"
+    rows = make_rows(4)
+    rows[2][7] = ""
+    locations = [(None, 2), (may, 2), (may, 3), (june, 2)]
+    snapshot = Snapshot(rows, locations)
+    # A row without an ID gets the legacy ID of its tab and row number
+    assert snapshot.rows[2][7] == f"{may}!r3"
+
+    added = make_rows(2, start=4)
+    assert not snapshot.apply("append", added, first_row=3, tab=may)
+    assert snapshot.apply("append", added, first_row=4, tab=may)
+    assert snapshot.locations[-2:] == [(may, 4), (may, 5)]
+    assert snapshot.location(snapshot.positions(["id5"])[0]) == (may, 5)
+    assert snapshot.apply("append", make_rows(1, start=6), first_row=3, tab=june)
+
+    assert snapshot.apply("status", ([f"{may}!r3", "id5"], "Closed"))
+    assert snapshot.rows[2][6] == snapshot.rows[5][6] == "Closed"
+
+
+def test_saving_extends_the_cached_month_snapshot(month_sheets):
+    snapshot = utils.get_snapshot()
+    calls = month_sheets.calls
+    row = make_rows(1)[0]
+    row[3] = "2025-05-20"
+    assert utils.save_to_sheet(row) is not None
+    # Folded into the cached snapshot instead of read again
+    assert utils.get_snapshot() is snapshot
+    assert month_sheets.calls == calls + 1
+    position = snapshot.positions([row[7]])[0]
+    assert snapshot.location(position) == (f"{utils.PARTITION_PREFIX} 2025-05", 2)
+
+    assert utils.update_status_in_sheet([row[7]], "Resolved") == 1
+    assert month_sheets.tabs[f"{utils.PARTITION_PREFIX} 2025-05"][1][6] == "Resolved"
+    assert snapshot.derived("facets").counts("status") == {"Resolved": 1}
+
+
+def _fill_months(month_sheets):
+    rows = make_rows(12)
+    for n, row in enumerate(rows):
+        row[3] = f"2025-0{5 + n % 2}-1{n % 3}"
+        tab = f"{utils.PARTITION_PREFIX} {row[3][:7]}"
+        month_sheets.load_rows([row], tab)
+    return rows
+
+
+def test_summary_reads_only_the_facet_columns(month_sheets):
+    rows = _fill_months(month_sheets)
+    backend = SheetsBackend()
+    summary = backend.summary()
+    assert month_sheets.calls == 2  # tab list, then one batchGet
+    assert utils.complaint_cache.peek("rows") is None
+    assert {row[1] for row in summary.rows} == {""}
+    assert backend.authors() == sorted({row[0] for row in rows})
+    assert backend.facet_counts("status") == facet_index.FacetIndex(rows).counts(
+        "status"
+    )
+    cube = summary.derived("cube")
+    assert cube.date_bounds() == aggregates._build_cube(Snapshot(rows)).date_bounds()
+
+
+def test_a_date_range_reads_only_its_months(month_sheets):
+    rows = _fill_months(month_sheets)
+    backend = SheetsBackend()
+    backend.summary()
+    snapshot = backend.snapshot("2025-06-10", "2025-06-10")
+    assert {tab for tab, _ in snapshot.locations} == {
+        f"{utils.PARTITION_PREFIX} 2025-06"
+    }
+    expected = [row[7] for row in rows if row[3] == "2025-06-10"]
+    assert backend.fetch(date_from="2025-06-10", date_to="2025-06-10") == [
+        row for row in rows if row[7] in expected
+    ]
+    assert backend.count(date_from="2025-06-10", date_to="2025-06-10") == len(expected)
@@ -0,0 +1,111 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from tenacity import wait_none
+
+import submit_queue
+import utils
+from storage import SheetsBackend, SQLiteBackend
+from submit_queue import SubmitQueue
+
+from conftest import make_rows
+
+
+@pytest.fixture
+def queue(sheets, tmp_path, monkeypatch):
+    """A SubmitQueue into the sheets fixture; call _drain() to send."""
+    monkeypatch.setattr(submit_queue, "SUBMIT_BATCH_SIZE", 4)
+    monkeypatch.setattr(submit_queue, "wait_exponential", lambda **kwargs: wait_none())
+    return SubmitQueue(SheetsBackend(), path=str(tmp_path / "queue.db"))
+
+
+def _fail(monkeypatch, method, errors, store_first=False):
+    """Make the next len(errors) requests of method raise, in turn."""
+    client = utils.get_client()
+    send = client._send
+    errors = list(errors)
+
+    def flaky(request):
+        if errors and request.methodId.endswith(method):
+            error = errors.pop(0)
+            if store_first:
+                send(request)
+            raise HttpError(httplib2.Response({"status": error}), b"error")
+        return send(request)
+
+    monkeypatch.setattr(client, "_send", flaky)
+
+
+def _stored_ids(sheets):
+    return [row[7] for row in sheets.tabs["Sheet1"][1:]]
+
+
+def test_queue_drains_in_batched_appends(sheets, queue):
+    rows = make_rows(6)
+    for row in rows:
+        queue.enqueue(row)
+    assert queue.status()["depth"] == 6
+    calls = sheets.calls
+    assert queue._drain()
+    assert _stored_ids(sheets) == [row[7] for row in rows]
+    # Two batches of at most four rows, one append each, plus the tab title
+    assert sheets.calls == calls + 3
+    status = queue.status()
+    assert status["depth"] == 0 and status["sent"] == 6
+
+
+def test_enqueue_gives_rows_their_id(sheets, queue):
+    queue.enqueue(make_rows(1)[0][:7])
+    (item,) = queue._next_batch()
+    cid = json.loads(item[1])[7]
+    assert cid
+    # The ID is fixed when queued, so a resend stores the same one
+    assert queue._drain()
+    assert _stored_ids(sheets) == [cid]
+
+
+def test_a_failed_append_is_sent_again(sheets, queue, monkeypatch):
+    rows = make_rows(3)
+    for row in rows:
+        queue.enqueue(row)
+    _fail(monkeypatch, "values.append", [503])
+    assert queue._drain()
+    assert _stored_ids(sheets) == [row[7] for row in rows]
+    assert queue.status()["failed_attempts"] == 1
+
+
+def test_an_append_stored_despite_its_error_is_not_sent_again(
+    sheets, queue, monkeypatch
+):
+    rows = make_rows(3)
+    for row in rows:
+        queue.enqueue(row)
+    _fail(monkeypatch, "values.append", [503], store_first=True)
+    assert queue._drain()
+    assert _stored_ids(sheets) == [row[7] for row in rows]
+    status = queue.status()
+    assert status["depth"] == 0 and status["sent"] == 3
+
+
+def test_rows_stay_queued_while_their_ids_cannot_be_checked(
+    sheets, queue, monkeypatch
+):
+    rows = make_rows(3)
+    for row in rows:
+        queue.enqueue(row)
+    _fail(monkeypatch, "values.append", [503], store_first=True)
+    _fail(monkeypatch, "values.batchGet", [400] * 5)
+    assert not queue._drain()
+    assert queue.status()["depth"] == 3
+    # Once the IDs can be read again nothing is sent twice
+    assert queue._drain()
+    assert _stored_ids(sheets) == [row[7] for row in rows]
+    assert queue.status()["depth"] == 0
+
+
+def test_sqlite_stored_ids(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "complaints.db"))
+    backend.append_many(make_rows(3))
+    assert backend.stored_ids(["id1", "id2", "unknown"]) == {"id1", "id2"}
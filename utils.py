@@ -1,24 +1,52 @@
 import os.path
 import os
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
+import json
+import logging
 import random
+import re
+import threading
+from collections import namedtuple
+from datetime import date
+import metrics
+from sheets_client import SheetsClient
+from complaint import COLUMNS, ID_COLUMN, STATUS_COLUMN, legacy_row_id, normalize_row
+from complaint_cache import ComplaintCache, Snapshot
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
-SHEET_RANGE = "Sheet1!A1"
-SHEET_DATA_RANGE = "Sheet1!A1:G1"  # Adjust the range as needed
+# Tab holding the complaints; looked up once from the spreadsheet if unset
+SHEET_NAME = os.getenv("SHEET_NAME")
+# Only the value grid is needed from reads, not range/majorDimension
+READ_FIELDS = "values"
+# Bulk append limits: rows and approximate JSON payload bytes per request
+APPEND_CHUNK_ROWS = int(os.getenv("APPEND_CHUNK_ROWS", "500"))
+APPEND_CHUNK_BYTES = int(os.getenv("APPEND_CHUNK_BYTES", str(1024 * 1024)))
+
+# Shared complaint cache: seconds before a refetch, and max cached snapshots
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "8"))
+# "monthly" routes complaints into one tab per month, e.g. "Complaints 2025-06"
+SHEET_PARTITIONS = os.getenv("SHEET_PARTITIONS", "").lower() == "monthly"
+PARTITION_PREFIX = os.getenv("SHEET_PARTITION_PREFIX", "Complaints")
+# Local Parquet copy of the sheet for warm starts; set empty to disable
+PARQUET_SNAPSHOT_DIR = os.getenv("PARQUET_SNAPSHOT_DIR", "complaint_snapshot")
+
+ChunkResult = namedtuple("ChunkResult", ["start", "rows", "ok", "result", "error"])
 
 
 def credentials():
+    # The auth stack is only imported when the Sheets client first needs it
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -33,10 +61,172 @@ def credentials():
     return creds
 
 
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide SheetsClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SheetsClient(credentials)
+    return _client
+
+
+def set_client(client):
+    """
+    Replace the process-wide client, e.g. with fake_sheets.FakeSheetsClient
+    for offline runs. The cached sheet title and snapshot are dropped.
+    """
+    global _client, _sheet_title, _tabs
+    with _client_lock:
+        _client = client
+        _sheet_title = SHEET_NAME
+        _tabs = None
+    complaint_cache.invalidate()
+
+
+def client_stats():
+    return get_client().snapshot_stats()
+
+
+complaint_cache = ComplaintCache(ttl=CACHE_TTL, maxsize=CACHE_MAXSIZE)
+
+
+def cache_stats():
+    return complaint_cache.stats()
+
+
+def _first_row(result):
+    """Sheet row number an append landed on, from its updatedRange."""
+    updated = (result or {}).get("updates", {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated)
+    return int(match.group(1)) if match else None
+
+
+def _cache_append(result, rows, tab=None):
+    first_row = _first_row(result)
+    if first_row is None:
+        complaint_cache.invalidate()
+    else:
+        # Extends the cached snapshot in place of a full reload
+        complaint_cache.apply("append", rows, first_row=first_row, tab=tab)
+
+
+_sheet_title = SHEET_NAME
+_tabs = None
+_tabs_lock = threading.Lock()
+
+
+def sheet_tabs():
+    """Return the titles of every tab, fetched at most once per process."""
+    global _tabs
+    if _tabs is None:
+        client = get_client()
+        metadata = client.execute(
+            client.service()
+            .spreadsheets()
+            .get(spreadsheetId=SPREADSHEET_ID, fields="sheets.properties.title")
+        )
+        _tabs = [sheet["properties"]["title"] for sheet in metadata["sheets"]]
+    return _tabs
+
+
+def sheet_title():
+    """Return the complaint tab title, fetching it at most once per process."""
+    global _sheet_title
+    if _sheet_title is None:
+        _sheet_title = sheet_tabs()[0]
+    return _sheet_title
+
+
+def a1(cells, tab=None):
+    """
+    Prefix an A1 cell reference with a quoted tab title; tab None is the
+    main complaint tab.
+    """
+    title = (tab or sheet_title()).replace("'", "''")
+    return f"'{title}'!{cells}"
+
+
+def partition_tab(date_str):
+    """
+    Month tab a complaint dated date_str belongs in, or None (the main
+    tab) when partitioning is off or the date is unreadable.
+    """
+    if not SHEET_PARTITIONS:
+        return None
+    try:
+        day = date.fromisoformat(str(date_str))
+    except ValueError:
+        return None
+    return f"{PARTITION_PREFIX} {day:%Y-%m}"
+
+
+def _tab_month(tab):
+    prefix = f"{PARTITION_PREFIX} "
+    if tab.startswith(prefix) and re.fullmatch(r"\d{4}-\d{2}", tab[len(prefix) :]):
+        return tab[len(prefix) :]
+    return None
+
+
+def partition_tabs(date_from=None, date_to=None):
+    """
+    Tabs that can hold complaints dated date_from..date_to: the main tab,
+    which keeps older and undated rows, then the month tabs in the range.
+    """
+    months = []
+    for tab in sheet_tabs():
+        month = _tab_month(tab)
+        if month is None:
+            continue
+        if (date_from and month < date_from[:7]) or (date_to and month > date_to[:7]):
+            continue
+        months.append((month, tab))
+    return [None] + [tab for _, tab in sorted(months)]
+
+
+def ensure_tab(tab):
+    """Create a month tab with the header row unless it already exists."""
+    global _tabs
+    if tab is None or tab in sheet_tabs():
+        return
+    with _tabs_lock:
+        if tab in sheet_tabs():
+            return
+        client = get_client()
+        spreadsheets = client.service().spreadsheets()
+        try:
+            client.execute(
+                spreadsheets.batchUpdate(
+                    spreadsheetId=SPREADSHEET_ID,
+                    body={"requests": [{"addSheet": {"properties": {"title": tab}}}]},
+                )
+            )
+        except HttpError as error:
+            # Most likely another process created it first
+            logger.warning("Creating tab %s failed: %s", tab, error)
+            _tabs = None
+            if tab not in sheet_tabs():
+                raise
+            return
+        client.execute(
+            spreadsheets.values().update(
+                spreadsheetId=SPREADSHEET_ID,
+                range=a1("A1", tab),
+                valueInputOption="RAW",
+                body={"values": [list(COLUMNS)]},
+            )
+        )
+        _tabs = _tabs + [tab]
+
+
 def append_values(spreadsheet_id, range_name, value_input_option, _values):
-    creds = credentials()
+    client = get_client()
     try:
-        service = build("sheets", "v4", credentials=creds)
+        service = client.service()
         values = [
             [
                 # Cell values ...
@@ -46,7 +236,7 @@ def append_values(spreadsheet_id, range_name, value_input_option, _values):
         if _values:
             values = [_values]
         body = {"values": values}
-        result = (
+        result = client.execute(
             service.spreadsheets()
             .values()
             .append(
@@ -55,54 +245,476 @@ def append_values(spreadsheet_id, range_name, value_input_option, _values):
                 valueInputOption=value_input_option,
                 body=body,
             )
-            .execute()
         )
-        # print(f"{(result.get('updates').get('updatedCells'))} cells appended.")
+        logger.debug("%s cells appended", result.get("updates", {}).get("updatedCells"))
         return result
 
     except HttpError as error:
-        # print(f"An error occurred: {error}")
+        logger.warning("Append to %s failed: %s", range_name, error)
         return error
 
 
 def save_to_sheet(values):
-    result = append_values(SPREADSHEET_ID, SHEET_RANGE, "RAW", values)
+    values = normalize_row(values)
+    tab = partition_tab(values[3])
+    try:
+        ensure_tab(tab)
+        result = append_values(SPREADSHEET_ID, a1("A1", tab), "RAW", values)
+    except HttpError as error:
+        # Raised by the tab lookup or creation
+        logger.warning("Saving complaint failed: %s", error)
+        return None
     if isinstance(result, HttpError):
-        # print(f"An error occurred: {result}")
         return None
+    _cache_append(result, [values], tab)
     return result
 
 
-def get_data_from_sheet():
-    creds = credentials()
-    try:
-        service = build("sheets", "v4", credentials=creds)
+def _to_row(item):
+    if hasattr(item, "to_row"):
+        return item.to_row()
+    # Rows written without an ID get a new one
+    return normalize_row(item)
+
+
+def chunk_rows(
+    rows, max_rows=APPEND_CHUNK_ROWS, max_bytes=APPEND_CHUNK_BYTES, key=None
+):
+    """
+    Split rows into chunks bounded by row count and approximate request size.
+    Yields (start_index, chunk) so callers can tell which rows a chunk holds.
+    If key is given, a chunk also ends where key(row) changes.
+    """
+    if hasattr(rows, "to_rows"):
+        # A ComplaintBatch converts to rows column-wise in one step
+        rows = rows.to_rows()
+    chunk = []
+    size = 0
+    start = 0
+    chunk_key = None
+    for index, item in enumerate(rows):
+        row = _to_row(item)
+        row_size = len(json.dumps(row, ensure_ascii=False).encode("utf-8")) + 1
+        row_key = key(row) if key else None
+        if chunk and (
+            len(chunk) >= max_rows
+            or size + row_size > max_bytes
+            or row_key != chunk_key
+        ):
+            yield start, chunk
+            chunk = []
+            size = 0
+        if not chunk:
+            start = index
+            chunk_key = row_key
+        chunk.append(row)
+        size += row_size
+    if chunk:
+        yield start, chunk
+
+
+def append_rows(
+    rows,
+    max_rows=APPEND_CHUNK_ROWS,
+    max_bytes=APPEND_CHUNK_BYTES,
+    stop_on_error=False,
+):
+    """
+    rows: iterable of row lists or Complaint objects, or a ComplaintBatch
+    Appends rows in chunks, one values().append call per chunk; the
+    client's quota scheduler paces the calls. With month tabs, a chunk only
+    holds rows of one month. Returns a list of ChunkResult; a failed chunk
+    keeps its rows so it can be retried with append_rows again. With
+    stop_on_error, nothing after the first failed chunk is sent.
+    """
+    client = get_client()
+    service = client.service()
+    key = (lambda row: partition_tab(row[3])) if SHEET_PARTITIONS else None
+    results = []
+    for start, chunk in chunk_rows(rows, max_rows, max_bytes, key):
+        tab = key(chunk[0]) if key else None
+        try:
+            ensure_tab(tab)
+            result = client.execute(
+                service.spreadsheets()
+                .values()
+                .append(
+                    spreadsheetId=SPREADSHEET_ID,
+                    range=a1("A1", tab),
+                    valueInputOption="RAW",
+                    insertDataOption="INSERT_ROWS",
+                    body={"values": chunk},
+                )
+            )
+            results.append(ChunkResult(start, chunk, True, result, None))
+            _cache_append(result, chunk, tab)
+        except HttpError as error:
+            logger.warning(
+                "Append of rows %d-%d failed: %s", start, start + len(chunk) - 1, error
+            )
+            results.append(ChunkResult(start, chunk, False, None, error))
+            if stop_on_error:
+                break
+    return results
+
+
+def iter_sheet_pages(page_rows, tab=None):
+    """
+    Yield (first_row, rows) pages of at most page_rows rows, one ranged
+    read each, until a page comes back short. Raises RuntimeError if a
+    page cannot be read.
+    """
+    first_row = 2
+    while True:
+        # Each read starts one row early, on the header or the previous
+        # page's last row, which exists; a range starting below the sheet's
+        # grid is an error
+        last_row = first_row + page_rows - 1
+        rows = get_data_from_sheet(first_row - 1, tab=tab, last_row=last_row)
+        if rows is None:
+            raise RuntimeError(f"Reading rows from {first_row} failed")
+        rows = rows[1:]
+        if rows:
+            yield first_row, rows
+        if len(rows) < page_rows:
+            return
+        first_row += page_rows
 
-        service = build("sheets", "v4", credentials=creds)
-        sheet_metadata = (
-            service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
+
+def failed_rows(results):
+    """Collect the rows of failed chunks for a retry."""
+    return [row for r in results if not r.ok for row in r.rows]
+
+
+def get_data_from_sheet(
+    first_row=2, fields=READ_FIELDS, tab=None, last_row=None
+):
+    """
+    Read every data row from first_row down in a single request.
+    The range is open-ended (A2:H), so no separate row count is needed;
+    last_row limits it to one page instead. tab None is the main
+    complaint tab.
+    """
+    client = get_client()
+    try:
+        result = client.execute(
+            client.service()
+            .spreadsheets()
+            .values()
+            .get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=a1(f"A{first_row}:H{last_row or ''}", tab),
+                fields=fields,
+            )
         )
-        sheet_name = sheet_metadata["sheets"][0]["properties"]["title"]
-        # Find the next empty row
-        result = (
-            service.spreadsheets()
+        return result.get("values", [])
+    except HttpError as error:
+        logger.warning("Reading complaints failed: %s", error)
+        return None
+
+
+def _read_keys_and_tail(last_row):
+    """
+    One batchGet returning (keys, tail): the Status and ID cells of rows
+    2..last_row, and every row after last_row. None on failure.
+    """
+    # The tail starts on last_row, which exists, and drops it again; a
+    # range starting below the sheet's grid is an error
+    client = get_client()
+    try:
+        result = client.execute(
+            client.service()
+            .spreadsheets()
             .values()
-            .get(spreadsheetId=SPREADSHEET_ID, range="Sheet1!A:A")
-            .execute()
+            .batchGet(
+                spreadsheetId=SPREADSHEET_ID,
+                ranges=[a1(f"G2:H{last_row}"), a1(f"A{last_row}:H")],
+                fields="valueRanges(range,values)",
+            )
         )
-        num_rows = len(result.get("values", [])) + 1
-        # Skip the first row (header), get all remaining rows
-        range_names = [f"{sheet_name}!A2:G{num_rows}"]
-        result = (
-            service.spreadsheets()
+    except HttpError as error:
+        logger.warning("Reading new complaints failed: %s", error)
+        return None
+    keys, tail = [r.get("values", []) for r in result.get("valueRanges", [])]
+    return keys, tail[1:]
+
+
+def backfill_ids(rows, locations=None):
+    """
+    Store the legacy ID of every row without one in column H, so later
+    reads find it instead of deriving it from the row number again. rows
+    are data rows as read from the sheet; locations their (tab, row
+    number), or None for rows 2.. of the main tab. All tabs are written in
+    one values.batchUpdate, spanning each tab's first to last row without
+    an ID. Returns the number of cells written; 0 on failure, which leaves
+    the IDs to be derived until a later load succeeds.
+    """
+    if locations is None:
+        locations = [(None, number) for number in range(2, len(rows) + 2)]
+    spans = {}
+    for row, (tab, number) in zip(rows, locations):
+        if len(row) <= ID_COLUMN or not row[ID_COLUMN]:
+            first, _ = spans.get(tab, (number, number))
+            spans[tab] = (first, number)
+    if not spans:
+        return 0
+    cells = {tab: {} for tab in spans}
+    for row, (tab, number) in zip(rows, locations):
+        if tab in cells:
+            cells[tab][number] = normalize_row(row, number, tab)[ID_COLUMN]
+    data = [
+        {
+            "range": a1(f"H{first}:H{last}", tab),
+            "values": [[cells[tab][n]] for n in range(first, last + 1)],
+        }
+        for tab, (first, last) in spans.items()
+    ]
+    client = get_client()
+    try:
+        result = client.execute(
+            client.service()
+            .spreadsheets()
             .values()
-            .batchGet(spreadsheetId=SPREADSHEET_ID, ranges=range_names)
-            .execute()
+            .batchUpdate(
+                spreadsheetId=SPREADSHEET_ID,
+                body={"valueInputOption": "RAW", "data": data},
+            )
         )
+    except HttpError as error:
+        logger.warning("Storing IDs of rows without one failed: %s", error)
+        return 0
+    return result.get("totalUpdatedCells", 0)
 
-        return result.get("valueRanges", [])[0].get("values", [])
-    except HttpError:
+
+def _reload_parquet(store):
+    rows = get_data_from_sheet()
+    if rows is not None:
+        backfill_ids(rows)
+        store.replace([normalize_row(row, n + 2) for n, row in enumerate(rows)])
+    return rows
+
+
+def _load_rows_with_parquet():
+    """
+    Rows from the local Parquet snapshot, brought up to date with the
+    sheet: rows after the last stored one are fetched and stored as a new
+    part, and Status cells that changed in the sheet are written back.
+    If IDs no longer line up, the snapshot is rebuilt from a full read.
+    """
+    # pyarrow is only needed here
+    from parquet_snapshot import ParquetSnapshot
+
+    try:
+        source = f"{SPREADSHEET_ID}/{sheet_title()}"
+    except HttpError as error:
+        logger.warning("Looking up the sheet failed: %s", error)
+        return None
+    store = ParquetSnapshot(PARQUET_SNAPSHOT_DIR, source)
+    with metrics.span("parquet_load"):
+        rows = store.load()
+    if not rows:
+        return _reload_parquet(store)
+    last_row = len(rows) + 1
+    fetched = _read_keys_and_tail(last_row)
+    if fetched is None:
+        # Serve the local copy while the sheet cannot be read
+        return rows
+    keys, tail = fetched
+    changed = False
+    for position, row in enumerate(rows):
+        key = keys[position] if position < len(keys) else []
+        status = key[0] if key else ""
+        cid = key[1] if len(key) > 1 and key[1] else legacy_row_id(position + 2)
+        if cid != row[ID_COLUMN]:
+            logger.warning("Sheet rows moved since the last snapshot; reloading")
+            return _reload_parquet(store)
+        if status != row[STATUS_COLUMN]:
+            row[STATUS_COLUMN] = status
+            changed = True
+    tail = [normalize_row(row, last_row + 1 + n) for n, row in enumerate(tail)]
+    if changed:
+        store.replace(rows + tail)
+    elif tail:
+        store.append(tail, last_row + 1)
+    return rows + tail
+
+
+def get_partitioned_rows(date_from=None, date_to=None):
+    """
+    Read the tabs that can hold complaints dated date_from..date_to in one
+    values.batchGet, so any number of tabs costs one round trip and one
+    unit of read quota. Returns (rows, locations) with the (tab, row
+    number) of each row, or None if the tabs could not be read.
+    """
+    client = get_client()
+    try:
+        tabs = partition_tabs(date_from, date_to)
+        with metrics.span("partition_fetch"):
+            result = client.execute(
+                client.service()
+                .spreadsheets()
+                .values()
+                .batchGet(
+                    spreadsheetId=SPREADSHEET_ID,
+                    ranges=[a1("A2:H", tab) for tab in tabs],
+                    fields="valueRanges(values)",
+                )
+            )
+    except HttpError as error:
+        logger.warning("Reading month tabs failed: %s", error)
         return None
+    # Value ranges come back in the order of the requested ranges
+    results = [r.get("values", []) for r in result.get("valueRanges", [])]
+    rows = []
+    locations = []
+    for tab, tab_rows in zip(tabs, results):
+        rows.extend(tab_rows)
+        locations.extend((tab, number) for number in range(2, len(tab_rows) + 2))
+    return rows, locations
+
+
+def _load_partitions(date_from=None, date_to=None):
+    loaded = get_partitioned_rows(date_from, date_to)
+    if loaded is None:
+        return None
+    backfill_ids(*loaded)
+    with metrics.span("snapshot_build"):
+        return Snapshot(*loaded)
+
+
+def _cells(values, n, width):
+    row = values[n] if n < len(values) else []
+    return row + [""] * (width - len(row))
+
+
+def _load_summary():
+    """
+    Snapshot of every tab holding only the author (A), date and time (D:E),
+    status and ID (G:H) cells; the other cells are empty. Titles,
+    descriptions and locations make up most of a row, so this is a small
+    part of a full read, taken in one values.batchGet. None on failure.
+    """
+    client = get_client()
+    try:
+        tabs = partition_tabs()
+        ranges = [
+            a1(cells, tab) for tab in tabs for cells in ("A2:A", "D2:E", "G2:H")
+        ]
+        with metrics.span("summary_fetch"):
+            result = client.execute(
+                client.service()
+                .spreadsheets()
+                .values()
+                .batchGet(
+                    spreadsheetId=SPREADSHEET_ID,
+                    ranges=ranges,
+                    fields="valueRanges(values)",
+                )
+            )
+    except HttpError as error:
+        logger.warning("Reading the complaint summary failed: %s", error)
+        return None
+    results = [r.get("values", []) for r in result.get("valueRanges", [])]
+    rows = []
+    locations = []
+    for i, tab in enumerate(tabs):
+        # Each range drops its trailing empty rows, so they may differ in length
+        authors, days, keys = results[3 * i : 3 * i + 3]
+        count = max(len(authors), len(days), len(keys))
+        for n in range(count):
+            author = _cells(authors, n, 1)
+            date_str, time_str = _cells(days, n, 2)
+            status, cid = _cells(keys, n, 2)
+            rows.append([*author, "", "", date_str, time_str, "", status, cid])
+        locations.extend((tab, number) for number in range(2, count + 2))
+    with metrics.span("snapshot_build"):
+        return Snapshot(rows, locations)
+
+
+def _load_snapshot():
+    if SHEET_PARTITIONS:
+        return _load_partitions()
+    if PARQUET_SNAPSHOT_DIR:
+        rows = _load_rows_with_parquet()
+    else:
+        rows = get_data_from_sheet()
+        if rows is not None:
+            backfill_ids(rows)
+    if rows is None:
+        return None
+    with metrics.span("snapshot_build"):
+        return Snapshot(rows)
+
+
+def get_snapshot(date_from=None, date_to=None):
+    """Read-through cached Snapshot of the sheet shared by all sessions,
+    or None if the sheet could not be read.
+
+    With month tabs, a date range is answered from the full snapshot if
+    it is cached, and otherwise from a snapshot of just the month tabs in
+    the range (plus the main tab); its rows outside the range still need
+    filtering out."""
+    if SHEET_PARTITIONS and (date_from or date_to):
+        full = complaint_cache.peek("rows")
+        if full is not None:
+            return full
+        first = date_from[:7] if date_from else None
+        last = date_to[:7] if date_to else None
+        return complaint_cache.get(
+            ("months", first, last), lambda: _load_partitions(date_from, date_to)
+        )
+    return complaint_cache.get("rows", _load_snapshot)
+
+
+def get_summary():
+    """
+    Cached Snapshot with at least the author, date, time, status and ID of
+    every complaint, for author lists, facet counts and date bounds, or
+    None if the sheet could not be read. With month tabs it only reads
+    those columns (see _load_summary), unless the full snapshot is
+    cached; otherwise it is the full snapshot.
+    """
+    if not SHEET_PARTITIONS:
+        return get_snapshot()
+    full = complaint_cache.peek("rows")
+    if full is not None:
+        return full
+    return complaint_cache.get("summary", _load_summary)
+
+
+def stored_ids(ids):
+    """
+    The subset of ids that a fresh read of the ID column (H) of every tab
+    finds, or None if the sheet could not be read. For appends that failed
+    in a way that may still have stored their rows. The cached snapshot is
+    dropped if any were found, as it was not told about them.
+    """
+    wanted = set(ids)
+    client = get_client()
+    try:
+        tabs = partition_tabs() if SHEET_PARTITIONS else [None]
+        result = client.execute(
+            client.service()
+            .spreadsheets()
+            .values()
+            .batchGet(
+                spreadsheetId=SPREADSHEET_ID,
+                ranges=[a1("H2:H", tab) for tab in tabs],
+                fields="valueRanges(values)",
+            )
+        )
+    except HttpError as error:
+        logger.warning("Reading complaint IDs failed: %s", error)
+        return None
+    found = {
+        row[0]
+        for r in result.get("valueRanges", [])
+        for row in r.get("values", [])
+        if row and row[0] in wanted
+    }
+    if found:
+        complaint_cache.invalidate()
+    return found
 
 
 def shorten_coords(coord_str):
@@ -113,56 +725,89 @@ def shorten_coords(coord_str):
         return coord_str
 
 
-def generate_save_test_data():
-    test_data = []
+def random_test_row(i):
+    """A random complaint row around Yonsei University, Seoul."""
     # Approximate coordinates for Yonsei University, Seoul: [37.5665, 126.9386]
-    for i in range(20):
-        lat = round(random.uniform(37.560, 37.570), 6)
-        lng = round(random.uniform(126.930, 126.945), 6)
-        row = [
-            f"Author{random.randint(1, 5)}",
-            f"Problem Title {i+1}",
-            f"Description for problem {i+1}",
-            f"2025-06-0{random.randint(1, 5)}",
-            f"{random.randint(0,23):02d}:{random.randint(0,59):02d}:{random.randint(0,59):02d}",
-            f"[{lat}, {lng}]",
-            f"{random.choice(['Pending', 'In Progress', 'Resolved', 'Closed'])}",
-        ]
-        test_data.append(row)
+    lat = round(random.uniform(37.560, 37.570), 6)
+    lng = round(random.uniform(126.930, 126.945), 6)
+    return [
+        f"Author{random.randint(1, 5)}",
+        f"Problem Title {i+1}",
+        f"Description for problem {i+1}",
+        f"2025-06-0{random.randint(1, 5)}",
+        f"{random.randint(0,23):02d}:{random.randint(0,59):02d}:{random.randint(0,59):02d}",
+        f"[{lat}, {lng}]",
+        f"{random.choice(['Pending', 'In Progress', 'Resolved', 'Closed'])}",
+    ]
+
 
-    for row in test_data:
-        save_to_sheet(row)
+def generate_save_test_data():
+    test_data = [random_test_row(i) for i in range(20)]
+    return append_rows(test_data)
 
 
-def update_status_in_sheet(selectors, new_status):
+def find_row_numbers(rows, ids):
     """
-    selectors: list of tuples (problem_title, date, time) to uniquely identify rows
+    rows: data rows as returned by get_data_from_sheet (header excluded)
+    ids: iterable of complaint IDs
+    Returns the 1-based sheet row numbers of the matching rows.
+    """
+    wanted = set(ids)
+    return [
+        idx + 2  # +1 for 1-based rows, +1 for the header row
+        for idx, row in enumerate(rows)
+        if normalize_row(row, idx + 2)[ID_COLUMN] in wanted
+    ]
+
+
+def update_status_in_sheet(ids, new_status):
+    """
+    ids: list of complaint IDs (column H; see backfill_ids for old rows)
     new_status: string, the new status to set
+    Only the Status cells (column G) of the matching rows are written.
+    Row locations (tab, row number) come from the cached snapshot's ID
+    index; tabs are append-only, so a known ID never moves. IDs the
+    snapshot has not seen yet are looked up with one fresh read.
     """
-    creds = credentials()
+    client = get_client()
     try:
-        service = build("sheets", "v4", credentials=creds)
-        # Get all data
-        all_data = get_data_from_sheet()
-        updated = 0
-        if all_data is not None:
-            for idx, row in enumerate(all_data):
-                if len(row) >= 7:
-                    title, date, time = row[1], row[3], row[4]
-                    if (title, date, time) in selectors:
-                        all_data[idx][6] = new_status
-                        updated += 1
-        # Write back all data (excluding header)
-        if updated > 0 and all_data is not None:
-            body = {"values": all_data}
-            service.spreadsheets().values().update(
-                spreadsheetId=SPREADSHEET_ID,
-                range=f"Sheet1!A2:G{len(all_data)+1}",
-                valueInputOption="RAW",
-                body=body,
-            ).execute()
-        return updated
-    except HttpError:
+        ids = list(ids)
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return 0
+        index = snapshot.derived("ids")
+        locations = [snapshot.location(index[i]) for i in ids if i in index]
+        missing = [i for i in ids if i not in index]
+        if missing and SHEET_PARTITIONS:
+            fresh = _load_partitions()
+            if fresh is not None:
+                locations += [fresh.location(p) for p in fresh.positions(missing)]
+        elif missing:
+            locations += [
+                (None, n) for n in find_row_numbers(get_data_from_sheet() or [], missing)
+            ]
+        if not locations:
+            return 0
+        body = {
+            "valueInputOption": "RAW",
+            "data": [
+                {"range": a1(f"G{n}", tab), "values": [[new_status]]}
+                for tab, n in sorted(set(locations), key=lambda l: (l[0] or "", l[1]))
+            ],
+        }
+        result = client.execute(
+            client.service()
+            .spreadsheets()
+            .values()
+            .batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body)
+        )
+        if missing:
+            complaint_cache.invalidate()
+        else:
+            complaint_cache.apply("status", (ids, new_status))
+        return result.get("totalUpdatedCells", len(locations))
+    except HttpError as error:
+        logger.warning("Status update failed: %s", error)
         return 0
 
 
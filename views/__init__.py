@@ -0,0 +1,8 @@
+"""
+One module per page of report_complaint.py. Each exposes render(backend)
+and imports its heavy dependencies at module level, so a page's imports
+are only paid for once that page is first shown.
+
+Not named "pages": Streamlit would turn a pages/ directory into its own
+multipage navigation.
+"""
@@ -0,0 +1,125 @@
+import pandas as pd
+import streamlit as st
+
+from complaint import COLUMNS, VALID_STATUSES
+from views.filters import facet_labels, stop_if_unavailable
+
+
+EDIT_PAGE_SIZES = [25, 50, 100, 200]
+
+
+def render(backend):
+    st.subheader("Edit Problem Statuses")
+    # Selected complaint IDs, kept across pages and filters
+    if "edit_selected" not in st.session_state:
+        st.session_state.edit_selected = set()
+    selected = st.session_state.edit_selected
+
+    # --- Filters, answered by the storage backend ---
+    authors = stop_if_unavailable(backend.authors())
+    author_label, status_label = facet_labels(backend, "edit_author", "edit_status")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        edit_author = st.selectbox(
+            "Filter by Author",
+            options=["All"] + authors,
+            index=0,
+            format_func=author_label,
+            key="edit_author",
+        )
+    with col2:
+        edit_status = st.selectbox(
+            "Filter by Status",
+            options=["All", *VALID_STATUSES],
+            index=0,
+            format_func=status_label,
+            key="edit_status",
+        )
+    with col3:
+        page_size = st.selectbox("Rows per page", EDIT_PAGE_SIZES, index=1)
+    edit_filters = {
+        "author": None if edit_author == "All" else edit_author,
+        "status": None if edit_status == "All" else edit_status,
+    }
+    total = stop_if_unavailable(backend.count(**edit_filters))
+    page_count = max(1, -(-total // page_size))
+    page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1)
+    st.caption(f"{total} problem(s), page {page_number} of {page_count}")
+
+    # Only the visible window is fetched, styled and sent to the browser
+    rows = backend.fetch(
+        **edit_filters, limit=page_size, offset=(page_number - 1) * page_size
+    )
+    df = pd.DataFrame(rows or [], columns=COLUMNS)
+    if not df.empty:
+        keys = df["ID"].tolist()
+        df["Select"] = [key in selected for key in keys]
+
+        # --- Status color styling (text color only) for Edit page ---
+        def color_status_text_edit(col):
+            color_map = {
+                "Pending": "color: #f7b731; font-weight: bold;",
+                "In Progress": "color: #3867d6; font-weight: bold;",
+                "Resolved": "color: #20bf6b; font-weight: bold;",
+                "Closed": "color: #a5b1c2; font-weight: bold;",
+            }
+            return [color_map.get(v, "") for v in col]
+
+        styled_df = df.style.apply(color_status_text_edit, subset=["Status"])
+        edited_df = st.data_editor(
+            styled_df,
+            use_container_width=True,
+            column_order=[
+                "Select",
+                "Status",
+                "Author",
+                "Problem Title",
+                "Description",
+                "Date",
+                "Time",
+                "Location",
+            ],
+            disabled=[
+                "Status",
+                "Author",
+                "Problem Title",
+                "Description",
+                "Date",
+                "Time",
+                "Location",
+            ],
+            hide_index=True,
+            # One editor state per window, so checkboxes don't leak between pages
+            key=f"problems_editor_{edit_author}_{edit_status}_{page_size}_{page_number}",
+        )
+        for key, is_selected in zip(keys, edited_df["Select"]):
+            if is_selected:
+                selected.add(key)
+            else:
+                selected.discard(key)
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"{len(selected)} problem(s) selected across all pages")
+        with col2:
+            if selected and st.button("Clear selection"):
+                selected.clear()
+                st.rerun()
+        new_status = st.selectbox(
+            "Set new status for selected:",
+            list(VALID_STATUSES),
+        )
+        if st.button("Update Status"):
+            if selected:
+                updated = backend.update_status(sorted(selected), new_status)
+                if updated > 0:
+                    selected.clear()
+                    st.success(
+                        f"Status updated for {updated} problem(s)! Please refresh to see changes."
+                    )
+                else:
+                    st.warning("No problems updated. Please check your selection.")
+            else:
+                st.warning("No problems selected.")
+    else:
+        st.write("No problems to edit.")
@@ -0,0 +1,41 @@
+import streamlit as st
+
+
+ALL = "All"
+
+
+def _value(choice):
+    return None if choice == ALL else choice
+
+
+def _label(counts):
+    def label(option):
+        return option if option == ALL else f"{option} ({counts.get(option, 0)})"
+
+    return label
+
+
+def stop_if_unavailable(value):
+    """
+    Return value, or stop the page with a notice if it is None, i.e. the
+    backend could not read the complaints. Each rerun reads them again.
+    """
+    if value is None:
+        st.warning("Complaint data is unavailable right now; retrying on refresh.")
+        st.button("Retry now")
+        st.stop()
+    return value
+
+
+def facet_labels(backend, author_key, status_key):
+    """
+    format_funcs for the author and status select boxes kept under
+    author_key and status_key. Each option shows how many rows it matches
+    together with the other box's current choice, as counted by the
+    backend's facet index.
+    """
+    author = st.session_state.get(author_key, ALL)
+    status = st.session_state.get(status_key, ALL)
+    author_counts = backend.facet_counts("author", status=_value(status))
+    status_counts = backend.facet_counts("status", author=_value(author))
+    return _label(author_counts), _label(status_counts)
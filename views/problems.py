@@ -0,0 +1,242 @@
+from datetime import date, timedelta
+
+import folium
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+import streamlit.components.v1 as components
+from streamlit_folium import st_folium
+
+import aggregates  # noqa: F401  registers the "cube" snapshot structure
+import metrics
+from complaint import VALID_STATUSES
+from density import cell_size_m
+from map_render import (
+    density_cells,
+    density_layer,
+    location_records,
+    map_cache,
+    render_marker_map,
+)
+from views.filters import facet_labels, stop_if_unavailable
+
+
+CENTER_START = [37.56325563600076, 126.93753719329834]
+DENSITY_START_ZOOM = 15
+
+
+@st.fragment
+def density_map(df, version, filter_key):
+    """
+    Complaints binned into cells sized from the map's current zoom. Only
+    this fragment reruns when the map is zoomed or panned; the cells for
+    a zoom level are cached like the rendered maps.
+    """
+    if "density_view" not in st.session_state:
+        st.session_state.density_view = {
+            "zoom": DENSITY_START_ZOOM,
+            "center": CENTER_START,
+        }
+    view = st.session_state.density_view
+
+    def update():
+        fmap = st.session_state["density_map"]
+        if fmap.get("zoom"):
+            view["zoom"] = fmap["zoom"]
+        if fmap.get("center"):
+            view["center"] = [fmap["center"]["lat"], fmap["center"]["lng"]]
+
+    zoom = view["zoom"]
+    with metrics.span("map_lookup"):
+        cells = map_cache.get(
+            version,
+            ("density", *filter_key, zoom),
+            lambda: density_cells(df, cell_size_m(zoom)),
+        )
+    st_folium(
+        folium.Map(location=CENTER_START, zoom_start=DENSITY_START_ZOOM),
+        center=view["center"],
+        zoom=zoom,
+        feature_group_to_add=density_layer(cells),
+        width=620,
+        height=600,
+        key="density_map",
+        returned_objects=["zoom", "center"],
+        on_change=update,
+    )
+
+
+def render(backend):
+    # Sheets reads come from snapshots shared across sessions and are
+    # filtered by their facet index; SQLite answers with indexed queries.
+    # The author list, filter counts and date bounds cover every complaint
+    # and come from the summary, which with month tabs only reads a few
+    # columns. Rows are only read for the dates selected below.
+    summary = stop_if_unavailable(backend.summary())
+    unique_authors = summary.derived("facets").values("author")
+
+    if not unique_authors:
+        st.write("No problems reported yet.")
+        st.stop()
+
+    st.write("## Reported Problems")
+
+    # --- Filters, labelled with their counts from the facet index ---
+    author_label, status_label = facet_labels(
+        backend, "problems_author", "problems_status"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        author_filter = st.selectbox(
+            "Filter by Author",
+            options=["All"] + unique_authors,
+            index=0,
+            format_func=author_label,
+            key="problems_author",
+        )
+    with col2:
+        status_filter = st.selectbox(
+            "Filter by Status",
+            options=["All", *VALID_STATUSES],
+            index=0,
+            format_func=status_label,
+            key="problems_status",
+        )
+
+    filters = {
+        "author": None if author_filter == "All" else author_filter,
+        "status": None if status_filter == "All" else status_filter,
+    }
+
+    # Date bounds come from the aggregate cube, not from the rows
+    first_day, last_day = summary.derived("cube").date_bounds(**filters)
+    if first_day is None:
+        st.write("✅ There are no problems reported for this filter!")
+        st.stop()
+    min_date = date.fromisoformat(first_day)  # Gets the min date of the google sheets
+    max_date = date.fromisoformat(last_day)  # Max date of the google sheets
+    if (
+        min_date == max_date
+    ):  # There is a bug if the min date and max date is the same the slider will not work.
+        max_date += timedelta(days=1)
+
+    show_all = st.checkbox("Show all dates", value=False)
+
+    if show_all:
+        selected_date = "All Days"
+        day_filters = dict(filters)
+    else:
+        selected_date = st.date_input(
+            "Select a date to view problems:",
+            min_value=min_date,
+            max_value=max_date,
+            value=min_date,
+            format="YYYY-MM-DD",
+        )
+        day = selected_date.isoformat()
+        day_filters = dict(filters, date_from=day, date_to=day)
+
+    # With month tabs, one day only reads its month's tab. Taken once,
+    # before the frame below, so a map is never cached under a newer
+    # version than the data it was drawn from
+    dates = {k: v for k, v in day_filters.items() if k.startswith("date_")}
+    snapshot = stop_if_unavailable(backend.snapshot(**dates))
+    version = snapshot.version
+    df = backend.fetch_frame(**day_filters)
+    malformed = int(df["Malformed"].sum())
+    if malformed:
+        st.caption(f"{malformed} row(s) have an unreadable location, date or time.")
+
+    if df.empty:
+        st.write("✅ There are no problems reported on this date!")
+        st.stop()
+
+    # --- Status color styling (text color only) ---
+    def color_status_text(col):
+        color_map = {
+            "Pending": "color: #f7b731; font-weight: bold;",
+            "In Progress": "color: #3867d6; font-weight: bold;",
+            "Resolved": "color: #20bf6b; font-weight: bold;",
+            "Closed": "color: #a5b1c2; font-weight: bold;",
+        }
+        return [color_map.get(v, "") for v in col]
+
+    styled_df = df.style.apply(color_status_text, subset=["Status"])
+    st.dataframe(
+        styled_df,
+        use_container_width=True,
+        column_order=[
+            "Status",
+            "Author",
+            "Problem Title",
+            "Description",
+            "Date",
+            "Time",
+            "Location",
+        ],
+    )
+
+    # Counts come from the aggregate cube, not from the rows
+    cube = snapshot.derived("cube")
+    st.write(
+        f"**Total number of problems reported on {selected_date}: {cube.total(**day_filters)}**"
+    )
+
+    st.markdown("---")
+    st.write("### Map of Reported Problems")
+
+    # Rendered once per snapshot version and filter, then reused by every
+    # rerun and session; these maps only display, so no st_folium round
+    # trip is needed
+    filter_key = (author_filter, status_filter, str(selected_date))
+    if st.toggle("Density view", help="Counts per area instead of markers"):
+        density_map(df, version, filter_key)
+    else:
+        with metrics.span("map_lookup"):
+            html = map_cache.get(
+                version,
+                ("markers", *filter_key),
+                lambda: render_marker_map(
+                    location_records(df), "Marker", CENTER_START
+                ),
+            )
+        components.html(html, width=620, height=600)
+
+    counts, titles = cube.hourly(**day_filters)
+    grouped = pd.DataFrame(
+        {
+            "Hour": list(range(24)),
+            "Problem Count": counts,
+            "Hover Text": [
+                "<br>".join(t) if t else "No problems reported" for t in titles
+            ],
+        }
+    )
+
+    # Plot
+    with metrics.span("plotly"):
+        fig = px.bar(
+            grouped,
+            x="Hour",
+            y="Problem Count",
+            hover_data={"Hover Text": True},
+            labels={"Hour": "Hour of the Day", "Problem Count": "Number of Problems"},
+            title="Problems Reported by Hour",
+        )
+        fig.update_traces(
+            hovertemplate="%{customdata[0]}", customdata=grouped[["Hover Text"]].values
+        )
+        fig.update_layout(xaxis=dict(dtick=1), dragmode=False)
+
+        st.plotly_chart(
+            fig,
+            use_container_width=True,
+            config={
+                "scrollZoom": False,
+                "displayModeBar": False,
+                "staticPlot": False,
+                "doubleClick": False,
+                "editable": False,
+                "displaylogo": False,
+            },
+        )
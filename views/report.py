@@ -0,0 +1,119 @@
+import os
+
+import folium
+import streamlit as st
+from streamlit_folium import st_folium
+
+from complaint import Complaint
+from spatial_index import OPEN_STATUSES
+from submit_queue import get_queue
+
+
+# Radius in meters to look for existing reports around the chosen location
+NEARBY_RADIUS_M = float(os.getenv("NEARBY_RADIUS_M", "50"))
+
+
+def render(backend):
+    st.subheader("Report a problem in Yonsei University")
+    CENTER_START = [37.56325563600076, 126.93753719329834]
+
+    # Initialize session state to store marker location
+    if "marker_location" not in st.session_state:
+        st.session_state.marker_location = (
+            CENTER_START  # Default location set to Yonsei Sinchon Campus
+        )
+        st.session_state.zoom = 16  # Default zoom
+
+    # Create FeatureGroup for marker
+    fg = folium.FeatureGroup(name="Marker")
+    # Add marker to the group
+    fg.add_child(
+        folium.Marker(
+            location=st.session_state.marker_location,
+            draggable=False,
+            popup="Marker title",
+            tooltip="Marker hover title",
+            icon=folium.Icon(
+                icon="exclamation", prefix="fa", color="red", icon_color="white"
+            ),
+        )
+    )
+
+    # Function to update marker location and zoom values in session_state when map changed
+    def update():
+        fmap = st.session_state["folium_map"]  # Get map from session_state
+        if fmap.get("last_clicked"):  # If map has last_clicked place
+            lat, lng = fmap["last_clicked"]["lat"], fmap["last_clicked"]["lng"]
+            st.session_state.marker_location = [
+                lat,
+                lng,
+            ]  # Update session state with new marker location
+            st.session_state.zoom = fmap[
+                "zoom"
+            ]  # Update session state with new zoom value
+
+    def submit():
+        if complaint.is_valid():
+            # Saved to the local queue; the background writer sends it on
+            get_queue(backend).enqueue(complaint.to_row())
+            st.toast(f"Form submitted! {complaint.__str__()}", icon="✅")
+        else:
+            st.toast("Please input all necessary infos.", icon="⁉️")
+
+    # Create the base map
+    st.markdown("### Click in the map to choose location", unsafe_allow_html=True)
+    m = folium.Map(location=CENTER_START, zoom_start=16)
+    st.write(
+        "<style>iframe[title='streamlit_folium.st_folium'] { height: 600px;}</style>",
+        unsafe_allow_html=True,
+    )
+    # Render the map and capture clicks
+    fmap = st_folium(
+        m,
+        center=st.session_state["marker_location"],
+        zoom=st.session_state["zoom"],
+        feature_group_to_add=fg,
+        width=620,
+        height=600,
+        key="folium_map",
+        on_change=update,
+    )
+    st.write(f"Coordinates: {st.session_state.marker_location}")
+
+    # Warn about open complaints already reported close to the marker
+    snapshot = backend.snapshot()
+    if snapshot is not None:
+        lat, lng = st.session_state.marker_location
+        nearby = snapshot.derived("spatial").query_radius(
+            lat, lng, NEARBY_RADIUS_M, statuses=OPEN_STATUSES
+        )
+        if nearby:
+            st.info(
+                f"{len(nearby)} open problem(s) already reported within "
+                f"{NEARBY_RADIUS_M:.0f} m of this location:"
+            )
+            for point_id, distance in nearby[:5]:
+                row = snapshot.rows[point_id]
+                st.write(f"- **{row[1]}** ({row[6]}, {distance:.0f} m away): {row[2]}")
+    st.markdown("---")
+    complaint = Complaint()
+    complaint.author = st.text_input("Your name:*", placeholder="John Doe")
+    complaint.problem = st.text_input("Problem title:*", placeholder="Problem")
+    complaint.description = st.text_area(
+        "Problem description:*", placeholder="Write as detailed as possible..."
+    )
+    complaint.date = st.date_input("Date:*")
+    complaint.time = st.time_input("Time:*", step=60)
+    complaint.location = (
+        st.session_state.marker_location
+    )  # Use the marker location from session state
+    submit_btn = st.button("submit", on_click=submit)
+
+    queue_status = get_queue(backend).status()
+    if queue_status["depth"]:
+        st.caption(
+            f"{queue_status['depth']} report(s) waiting to be saved, "
+            f"oldest {queue_status['oldest_age']:.0f}s ago."
+        )
+        if queue_status["last_error"]:
+            st.caption(f"Last save error: {queue_status['last_error']}")